@@ -6,23 +6,13 @@ import torch
 from controlnet_aux import OpenposeDetector
 import atexit
 import numpy as np
-from deepface import DeepFace
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 import json
-import mne
-import matplotlib.pyplot as plt
-import scipy
 from flask_cors import CORS
 import torch
-from flask import Flask, Response, render_template, stream_with_context
+from flask import Flask, Response, render_template, stream_with_context, jsonify
 import time
 from mne import create_info
-from scipy import signal
-import pickle
-from joblib import load
-import matplotlib as mpl
 from PIL import Image
-import matplotlib.cm as cm
 from PyQt5 import QtWidgets
 import math
 import pylsl
@@ -31,26 +21,35 @@ from pyqtgraph.Qt import QtCore, QtGui
 from typing import List
 from pylsl import StreamInlet, resolve_stream
 import warnings
+from utils.camera import CameraHub
+from utils.emotion import EMOTIONS, EmotionWorker
+from utils.face_tracker import FaceTracker
+from utils.model_registry import AttentionModelRegistry
+from utils.inference import AttentionBatcher
+from utils.pipelines import PipelineManager
+from utils.features import StreamingBandPower, extract_features, feature_window
+from utils.ring_buffer import RingBuffer
+from utils.acquisition import LSLAcquisition
+from utils.topomap import TopomapRenderer, topomap_meta
+from utils.eeg_stream import ENCODINGS, EEGEncoder, frame_sleep
+from utils.eeg_cache import load_cached_eeg, create_info as create_eeg_info
 warnings.filterwarnings(action='ignore')
 
 # Flask 애플리케이션 생성
 app = Flask(__name__)
 CORS(app)
 
-# 웹캠 비디오 캡처 객체 생성
-cap = cv2.VideoCapture(0)
+# 웹캠 캡처 허브 생성 (모든 영상 피드가 하나의 캡처 스레드를 공유)
+camera = CameraHub(0)
+camera.start()
 
 def load_eeg_data():
     file_names = './datas/eeg_record3.mat'
-    mat = scipy.io.loadmat(file_names)
-    data = mat['o']['data'][0,0]
-    sfreq = mat['o']['sampFreq'][0][0][0][0]
-    channel_names = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
-    info = create_info(channel_names, sfreq, ch_types=['eeg']*len(channel_names))
-    info.set_montage('standard_1020')
-    info['description'] = 'AIMS'
+    concatenated_data, meta = load_cached_eeg(
+        file_names, './datas/cache/eeg_record3.npy', layout='emotiv',
+        start=5000, stop=15000, description='AIMS')
+    info = create_eeg_info(meta)
 
-    concatenated_data = data[5000:15000, 3:17].T
     return info, concatenated_data
 
 def load_realtime_eeg_data():
@@ -65,57 +64,68 @@ def load_realtime_eeg_data():
 
     return info, inlet
 
+# 실시간 EEG 샘플 링 버퍼 (14채널 × 30초), LSL 청크의 3:17 열이 EEG 채널
+eeg_ring = RingBuffer(14, 128 * 30)
+# 서버 시작 시 LSL 수집 스레드가 eeg_ring을 채움
+acquisition = None
+
 ########################################🌟 MNE TOPOLOGY###################################
 
+MNE_FRAME_INTERVAL = 1 / 30  # topomap 최대 30 fps
+MNE_VLIM = (4150, 4500)
+
 # Generate MNE topomaps
 def generate_mne():
-    global info, samples, timestamps, global_sample
+    global info
+
+    # 몽타주 기반 보간 행렬/컬러맵/머리 윤곽을 한 번만 계산
+    renderer = TopomapRenderer(info, vlim=MNE_VLIM)
+
+    buffer_size = 1
+    last_index = 0
 
-    plt.style.use("dark_background")
-    fig = plt.figure(figsize=(7, 4), facecolor='none')
-    ax = fig.add_subplot(111)
+    while True:
+        frame_start = time.time()
+        if eeg_ring.write_index == last_index:
+            time.sleep(0.01)
+            continue
+
+        last_index = eeg_ring.write_index
+        eeg_buffer, _ = eeg_ring.latest(buffer_size)
+        epochs = np.mean(eeg_buffer, axis=1)
 
-    vmax = 4500
-    vmin = 4150
+        png = renderer.render_png(epochs)
+
+        yield (b'--frame\r\n'
+            b'Content-Type: image/png\r\n\r\n' + png + b'\r\n')
+
+        time.sleep(max(0.0, MNE_FRAME_INTERVAL - (time.time() - frame_start)))
+        
+# Stream topomap channel values only; mne_feed.html interpolates and draws them
+def generate_mne_data():
+    global info
+
+    meta = topomap_meta(info, vlim=MNE_VLIM)
+    yield f"event: meta\ndata:{json.dumps(meta)}\n\n"
 
-    norm = mpl.colors.Normalize(vmin=vmin, vmax=vmax)
-    colormapping = cm.ScalarMappable(norm=norm, cmap='jet') #, cmap=cmap
-    cb = fig.colorbar(colormapping, ax=plt.gca(), location='right', pad=0.04)
     buffer_size = 1
-    eeg_buffer = np.zeros((14, buffer_size))
+    last_index = 0
 
     while True:
-        if timestamps:
-            data = np.array(global_sample[0]).T
-
-            eeg_buffer = np.roll(eeg_buffer, -len(timestamps), axis=1)
-            eeg_buffer[:, -len(timestamps):] = data.reshape(-1, 1)
-
-            epochs_data = eeg_buffer[:, :, np.newaxis].transpose((2, 0, 1))
-            epochs = np.mean(epochs_data, axis=2)
-
-            ax.clear()
-
-            mne.viz.plot_topomap(
-                epochs[0],
-                info,
-                vlim=(vmin, vmax),
-                axes=ax,
-                show=False,
-                outlines='head',
-                cmap='jet',
-                sensors=False,
-                contours=0
-            )
-
-            canvas = FigureCanvas(fig)
-            buf = io.BytesIO()
-            canvas.print_png(buf)
-            buf.seek(0)
-
-            yield (b'--frame\r\n'
-                b'Content-Type: image/png\r\n\r\n' + buf.read() + b'\r\n')
-            
+        frame_start = time.time()
+        if eeg_ring.write_index == last_index:
+            time.sleep(0.01)
+            continue
+
+        last_index = eeg_ring.write_index
+        eeg_buffer, _ = eeg_ring.latest(buffer_size)
+        epochs = np.mean(eeg_buffer, axis=1)
+
+        json_data = json.dumps({'values': np.round(epochs, 2).tolist()})
+        yield f"data:{json_data}\n\n"
+
+        time.sleep(max(0.0, MNE_FRAME_INTERVAL - (time.time() - frame_start)))
+
 # Route to display MNE topomaps
 @app.route('/mne_feed_model')
 def mne_feed_model():
@@ -125,34 +135,57 @@ def mne_feed_model():
     
     return response
 
+@app.route('/mne_feed_data')
+def mne_feed_data():
+    response = Response(stream_with_context(generate_mne_data()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+
+    return response
+
 @app.route('/mne_feed')
 def mne_feed():
-    return render_template('mne_feed.html')
+    # 기본은 브라우저 렌더링(data), ?mode=png 이면 서버 렌더링 PNG 스트림
+    return render_template('mne_feed.html', mode=request.args.get('mode', 'data'))
 
 ########################################🌟 EEG PLOT###################################
 
-def generate_data():
-    global samples, timestamps, global_sample
-    time_step = 0
+EEG_FRAME_RATE = 20  # SSE 이벤트/초, 이벤트마다 그 사이에 들어온 모든 샘플을 묶어서 전송
+EEG_MAX_FRAME_RATE = 60  # ?fps 상한
 
-    while True:
-        samples, timestamps = inlet.pull_chunk(timeout=1.0, max_samples=4)
-        if timestamps:
-            global_sample = [row[3:17] for row in samples]
-            sample = global_sample[0]
-            time_step += 1
+def generate_data(frame_rate=EEG_FRAME_RATE, encoding='json'):
+    # i16 오프셋/스케일 보정을 위해 1초 분량의 샘플을 기다림
+    while eeg_ring.write_index < SFREQ:
+        time.sleep(0.01)
 
-            json_data = json.dumps(
-                {'time': time_step, 'value': sample})
+    calibration, _ = eeg_ring.latest(SFREQ)
+    encoder = EEGEncoder(CHANNEL_NAMES, SFREQ, encoding, calibration=calibration)
+    yield encoder.header_event()
 
-            yield f"data:{json_data}\n\n"
-            time.sleep(0.01)
+    last_index = eeg_ring.write_index
+
+    while True:
+        frame_start = time.monotonic()
+        block, timestamps, last_index = eeg_ring.since(last_index)
+        if block.shape[1]:
+            time_step = last_index - block.shape[1]
+            yield encoder.encode(time_step, float(timestamps[0]), block)
+
+        frame_sleep(frame_start, frame_rate)
             
 @app.route('/eeg_feed_model')
 def eeg_feed_model():
     #_, concatenated_data = load_eeg_data()
     #_, inlet = load_realtime_eeg_data()
-    response = Response(stream_with_context(generate_data()), mimetype="text/event-stream")
+    frame_rate = request.args.get('fps', EEG_FRAME_RATE, type=float)
+    if not 0 < frame_rate <= EEG_MAX_FRAME_RATE:
+        return f"fps must be in (0, {EEG_MAX_FRAME_RATE}], but got {frame_rate}", 400
+    # json(기본) | f32 | i16 : base64 바이너리 프레임은 대역폭을 크게 줄임
+    encoding = request.args.get('encoding', 'json')
+    if encoding not in ENCODINGS:
+        return f"Unknown encoding: {encoding}", 400
+
+    response = Response(stream_with_context(generate_data(frame_rate, encoding)), mimetype="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
 
@@ -160,7 +193,13 @@ def eeg_feed_model():
 
 @app.route('/eeg_feed')
 def eeg_feed():
-    return render_template('eeg_feed.html')
+    return render_template('eeg_feed.html', encoding=request.args.get('encoding', 'json'))
+
+@app.route('/eeg_acquisition_status')
+def eeg_acquisition_status():
+    if acquisition is None:
+        return jsonify({"running": False})
+    return jsonify(acquisition.stats())
 
 ########################################🌟 ATTENTION PLOT###################################
 
@@ -171,124 +210,69 @@ BAND_PASS_LOW = 0.16
 TIME_WINDOW = 1
 
 select_ch = ['F7', 'F3', 'AF4', 'P7', 'P8', 'O1', 'O2']
-use_channel_inds = []
+use_channel_inds = [CHANNEL_NAMES.index(ch) for ch in select_ch]
 diff_focus = "focus" 
 
-# Apply a Butterworth high-pass filter
-def butter_highpass(cutoff, fs, order=5):
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = signal.butter(order, normal_cutoff, btype='high', analog=False)
-    return b, a
-
-# Apply a high-pass filter to EEG data
-def butter_highpass_filter(data, cutoff, fs, order=5):
-    b, a = butter_highpass(cutoff, fs, order=order)
-    x = signal.filtfilt(b, a, data)
-    y = signal.filtfilt(b, a, x)
-    return y
-
-# Extract features from EEG data
-def extract_features(concatenated_eeg, time_window, time_points, window_blackman):
-    col = len(select_ch) #7
-    power_eeg = {}
-    bin_eeg = {}
-    bin_eeg_avg = {}
-    knn_focus ={}
-
-    power_eeg['data']=np.zeros([7, 513, time_window+1])
-    bin_eeg['data']=np.zeros([7, 36, time_window+1])
-    bin_eeg_avg['data']=np.zeros([7, 36, 1])
-    knn_focus['data']=np.zeros([252,1])
-
-    if concatenated_eeg.shape[0] < time_points:
-        original_array = np.random.rand(concatenated_eeg.shape[0],7)
-        additional_values = np.random.rand(time_points - concatenated_eeg.shape[0], 7)
-        concatenated_eeg = np.concatenate((original_array, additional_values))
-
-    else:
-        pass
-    
-    for i in range(col):
-        concatenated_eeg[:,i] = butter_highpass_filter(concatenated_eeg[:,i], 0.16, 128, 5)
-        f, t, y1=scipy.signal.stft(concatenated_eeg[:,i],fs=128, window=window_blackman, nperseg=128, 
-                      noverlap=0, nfft=1024, detrend=False,return_onesided=True, boundary='zeros',
-                      padded=True)
-        
-        power_eeg['data'][i,:, :]=(np.abs(y1))**2
-        
-    for chn in range(col):
-        j=0
-        for i in range(1,144,4):
-            bin_eeg['data'][chn,j,:]=np.average(power_eeg['data'][chn,i:i+4,:],axis=0)
-            j+=1
-
-    for chn in range(col):
-        j=0
-        for k in range(0,1):
-            bin_eeg_avg['data'][chn,:,j]=np.average(bin_eeg['data'][chn,:,k:k+(601-time_window+1)],axis=1)
-            j += 1
-
-    for j in range(1):      
-        knn_focus['data'][:,j]=bin_eeg_avg['data'][:,:,j].reshape(1,-1)
-
-    knn_focus['data'] = 10*np.log(knn_focus['data'])
-    if time_window == 15:
-        loaded_scaler = load('./models/scaler_knn.joblib')
-        with open('./models/saved_model', 'rb') as f:
-            mod = pickle.load(f)
-
-    elif time_window == 5:
-        loaded_scaler = load('./models/scaler_knn_5second.joblib')
-        with open('./models/saved_model_5second', 'rb') as f:
-            mod = pickle.load(f)
-
-    elif time_window == 10:
-        loaded_scaler = load('./models/scaler_knn_10second.joblib')
-        with open('./models/saved_model_10second', 'rb') as f:
-            mod = pickle.load(f)
-
-    elif time_window == 1:
-        loaded_scaler = load('./models/scaler_knn_1second.joblib')
-        with open('./models/saved_model_1second', 'rb') as f:
-            mod = pickle.load(f)
-
-    return knn_focus['data'].T,loaded_scaler, mod
-
-def get_attention():
-    global diff_focus, samples, timestamps, global_sample
-    time_step = 0
+# 시간 창별 scaler/KNN 모델을 한 번만 로드해 메모리에 유지 (fast: 학습 행렬 기반 BLAS KNN, sklearn과 예측 일치 확인 후 사용)
+attention_models = AttentionModelRegistry('./models', backend='fast')
+ATTENTION_HOP = 0.125  # estimator=streaming 의 기본 hop (초)
+
+# 모든 세션/브라우저의 attention 요청을 ~5 ms 동안 모아 한 번에 transform + predict
+attention_batcher = AttentionBatcher(attention_models, max_wait=0.005)
+
+def get_attention(hop=None, streaming=None):
+    global diff_focus
     time_points = TIME_WINDOW * SFREQ
-    t_win = np.arange(0, 128)
+    last_index = 0
+    # hop(초)마다 겹치는 창으로 추정, 기본은 TIME_WINDOW마다 한 번
+    interval = TIME_WINDOW if hop is None else hop
     
-    M = 12
-    window_blackman = 0.42 - 0.5 * np.cos((2 * np.pi * t_win) / (M - 1)) + 0.08 * np.cos((4 * np.pi * t_win) / (M - 1))
+    window_blackman = feature_window()
 
     while True:
-        #samples, timestamps = inlet.pull_chunk(timeout=1.0, max_samples=buffer_size)
-        #samples = concatenated_data[:, time_step:time_step + time_points]
-
-        if timestamps:
-            time_step += time_points
+        # 전체 time_points 샘플이 모이고 새 샘플이 들어왔을 때만 계산
+        if eeg_ring.write_index < time_points or eeg_ring.write_index == last_index:
+            time.sleep(0.01)
+            continue
 
-            samples = np.array(global_sample)
+        if streaming is None:
+            last_index = eeg_ring.write_index
+            samples, _ = eeg_ring.latest(time_points)
 
             realtime_data = samples[use_channel_inds, :]
 
-            realtime_data, loaded_scaler, mod = extract_features(realtime_data.T, TIME_WINDOW, time_points, window_blackman)
-            realtime_data_scaled = loaded_scaler.transform(realtime_data)
-            
-            value = mod.predict(realtime_data_scaled)[0]
-            diff_focus = "focus" if value == 0 else ("unfocus" if value == 1 else ("drowsy" if value == 2 else "unknown"))
+            realtime_data = extract_features(realtime_data.T, TIME_WINDOW, time_points, window_blackman)
+        else:
+            # 새로 들어온 샘플만 밴드 파워 상태에 반영 (근사치, StreamingBandPower 참고)
+            samples, _, last_index = eeg_ring.since(last_index)
+            streaming.update(samples[use_channel_inds, :])
+            if not streaming.ready:
+                continue
+            realtime_data = streaming.features()
 
-            yield f"data: {value}\n\n"
-            
-            time.sleep(TIME_WINDOW) 
+        value = attention_batcher.predict(TIME_WINDOW, realtime_data)
+        diff_focus = "focus" if value == 0 else ("unfocus" if value == 1 else ("drowsy" if value == 2 else "unknown"))
+
+        yield f"data: {value}\n\n"
+        
+        time.sleep(interval) 
 
 @app.route('/attention_feed_model')
 def attention_feed_model():
     #_, concatenated_data = load_eeg_data()
-    response = Response(stream_with_context(get_attention()), mimetype="text/event-stream")
+    # ?hop=0.125 : 125 ms마다 겹치는 창으로 추정, &estimator=streaming : 증분 밴드 파워(근사)
+    hop = request.args.get('hop', type=float)
+    if hop is not None and not hop >= 1 / SFREQ:
+        return f"hop must be at least one sample (1/{SFREQ} s), but got {hop}", 400
+    streaming = None
+    if request.args.get('estimator', 'exact') == 'streaming':
+        try:
+            streaming = StreamingBandPower(len(use_channel_inds), TIME_WINDOW,
+                                           hop=int(round((hop or ATTENTION_HOP) * SFREQ)))
+        except ValueError as e:
+            return str(e), 400
+
+    response = Response(stream_with_context(get_attention(hop, streaming)), mimetype="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
 
@@ -301,12 +285,16 @@ def attention_feed():
 ########################################🌟 DIFFUSION MODEL###################################
 cmd = "Character"
 
-def generate_images(openpose, pipe):
-    global cmd, diff_focus, diff_emotion
+# ControlNet 파이프라인을 첫 요청 때 한 번만 만들어 모든 요청이 공유
+pipelines = PipelineManager()
+
+def generate_images():
+    global cmd, diff_focus
     success = True
     
     focus_cmd = "strongly"
     emotion_cmd  = "happy"
+    seq = 0
 
     while success:
         if diff_focus == "drowsy" or diff_focus == "unfocus":
@@ -314,12 +302,16 @@ def generate_images(openpose, pipe):
         else:
             focus_cmd = "strongly"
 
-        emotion_cmd = diff_emotion
-        ret, frame = cap.read()
+        emotion_cmd = emotion_worker.dominant
+        seq, frame = camera.wait(seq)
+        if frame is None:
+            break
 
-        pose_img = openpose(frame)
+        # 파이프라인은 모든 시청자가 공유하므로 한 프레임씩 번갈아 생성
+        with pipelines.use("controlnet") as (openpose, pipe):
+            pose_img = openpose(frame)
 
-        image_output = pipe(f"{focus_cmd} + ' ' + {emotion_cmd}, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single girl character, art like, very high quality", pose_img, negative_prompt="normal quality, low quality, worst quality, jpeg artifacts, chinese, username, watermark, signature, time signature, timestamp, artist name, copyright name, copyright, loli, child, infant, baby, bad anatomy, extra hands, extra legs, extra digits, extra_fingers, wrong finger, inaccurate limb, African American, African, tits, nipple, pubic hair", num_inference_steps=15).images[0]
+            image_output = pipe(f"{focus_cmd} + ' ' + {emotion_cmd}, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single girl character, art like, very high quality", pose_img, negative_prompt="normal quality, low quality, worst quality, jpeg artifacts, chinese, username, watermark, signature, time signature, timestamp, artist name, copyright name, copyright, loli, child, infant, baby, bad anatomy, extra hands, extra legs, extra digits, extra_fingers, wrong finger, inaccurate limb, African American, African, tits, nipple, pubic hair", num_inference_steps=15).images[0]
         combined_img = np.concatenate((pose_img, image_output), axis=1)
         combined_pil_img = Image.fromarray(combined_img)
 
@@ -332,9 +324,8 @@ def generate_images(openpose, pipe):
         yield (b'--frame\r\n'
             b'Content-Type: image/jpeg\r\n\r\n' + img_bytes + b'\r\n')
 
-@app.route('/diffusion_feed_model', methods=['GET'])
-def diffusion_feed_model():
-    # OpenPose 모델 및 Diffusion 초기화
+def build_controlnet_pipeline():
+    # OpenPose 모델 및 Diffusion 초기화 (프로세스당 한 번)
     openpose = OpenposeDetector.from_pretrained('lllyasviel/ControlNet')
     controlnet = ControlNetModel.from_pretrained("lllyasviel/control_v11p_sd15_openpose", torch_dtype=torch.float16)
     pipe = StableDiffusionControlNetPipeline.from_pretrained("runwayml/stable-diffusion-v1-5", controlnet=controlnet, safety_checker=None, torch_dtype=torch.float16)
@@ -343,7 +334,19 @@ def diffusion_feed_model():
     pipe.enable_xformers_memory_efficient_attention()
     pipe.set_progress_bar_config(disable=True)
 
-    response = Response(generate_images(openpose, pipe), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return openpose, pipe
+
+pipelines.register("controlnet", build_controlnet_pipeline)
+
+@app.route('/diffusion_feed_model', methods=['GET'])
+def diffusion_feed_model():
+    # 첫 요청만 모델 로드를 기다리고, 이후 요청은 같은 파이프라인을 공유
+    try:
+        pipelines.get("controlnet")
+    except Exception as e:
+        return f"Error: Could not load the diffusion pipeline: {e}", 503
+
+    response = Response(generate_images(), mimetype='multipart/x-mixed-replace; boundary=frame')
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
 
@@ -355,32 +358,33 @@ def diffusion_feed():
 
 
 ########################################🌟 EMOTION RECOGNITION###################################
-diff_emotion = "happy"
+EMOTION_FPS = 5  # DeepFace 분석 최대 횟수/초 (시청자 수와 무관)
+FACE_DETECT_EVERY = 10  # 얼굴 전체 검출 주기(프레임), 그 사이는 템플릿 매칭으로 추적
+
+# 얼굴 피드와 감정 워커가 공유하는 얼굴 위치 추적기 (프레임 seq별로 한 번만 계산)
+face_tracker = FaceTracker("./models/haarcascade_frontalface_alt.xml", detect_every=FACE_DETECT_EVERY)
+
+# 최신 카메라 프레임만 분석하는 공유 감정 인식 워커, 모든 구독자와 프롬프트 생성이 결과를 읽음
+# 시작하자마자 DeepFace 감정 모델/얼굴 검출기를 미리 로드(warmup)
+emotion_worker = EmotionWorker(camera, target_fps=EMOTION_FPS, default="happy", face_tracker=face_tracker)
+emotion_worker.start()
 
 @app.route('/emotion_feed_model')
 def emotion_feed_model():
-    emotions = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
-
     def generate_emotion_data():
-        global diff_emotion
-        success = True
-
-        while success:
-            success, frame = cap.read()                               
-            if success:
-                # Perform emotion analysis
-                predictions = DeepFace.analyze(frame, actions=['emotion'], detector_backend="opencv", enforce_detection=False, silent=True)
-                emotion_data = predictions[0]['emotion']
-                probabilities = [emotion_data[emotion] for emotion in emotions]
-
-                max_probability_index = probabilities.index(max(probabilities))
-                max_emotion = emotions[max_probability_index]
-
-                diff_emotion = max_emotion
-                # Create JSON data to send to the front-end
-                json_data = json.dumps({'emotions': emotions, 'probabilities': probabilities})
-                yield f"data:{json_data}\n\n"
-            
+        seq = 0
+
+        while True:
+            seq, probabilities = emotion_worker.wait(seq, timeout=5.0)
+            if probabilities is None:
+                # 새 결과가 없으면 연결 확인용 주석만 전송
+                yield ": keepalive\n\n"
+                continue
+
+            # Create JSON data to send to the front-end
+            json_data = json.dumps({'emotions': EMOTIONS, 'probabilities': probabilities})
+            yield f"data:{json_data}\n\n"
+
     response = Response(generate_emotion_data(), mimetype="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
@@ -390,15 +394,39 @@ def emotion_feed_model():
 def emotion_feed():
     return render_template('emotion_feed.html')
 
+########################################🌟 READINESS ###################################
+
+READY_COMPONENTS = ["emotion", "attention"]
+
+# 대시보드가 모델 warmup 완료 여부를 확인하는 엔드포인트 (준비되면 200, 아니면 503)
+@app.route('/ready')
+def ready():
+    loaded = attention_models.loaded()
+    components = {
+        "emotion": emotion_worker.readiness(),
+        # 피드가 쓰는 TIME_WINDOW 모델이 로드되어야 준비 완료
+        "attention": {"state": "ready" if TIME_WINDOW in loaded else "cold", "time_windows": loaded},
+        # 생성 파이프라인은 첫 요청 때 로드되므로 로드 상태만 보고하고 준비 여부에는 포함하지 않음
+        "diffusion": pipelines.readiness(),
+    }
+    is_ready = all(components[name]["state"] == "ready" for name in READY_COMPONENTS)
+
+    return jsonify(ready=is_ready, components=components), 200 if is_ready else 503
+
 ########################################🌟 POSE ESTIMATION###################################
 
-def generate_frames(faceCascade):
+def generate_frames():
+    seq = 0
     while True:
-        success, frame = cap.read()
-        if success:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = faceCascade.detectMultiScale(gray, 1.1, 5)
-            for (x,y,w,h) in faces:
+        seq, frame = camera.wait(seq)
+        # 카메라가 닫히면 wait가 바로 반환되므로 스트림 종료
+        if frame is None and not camera.is_opened():
+            break
+        if frame is not None:
+            box = face_tracker.locate(seq, frame)
+            frame = frame.copy()
+            if box is not None:
+                x, y, w, h = box
                 cv2.rectangle(frame, (x,y), (x+w, y+h), (0,255,0), 4)
 
             # 프레임을 바이트로 변환하여 스트리밍
@@ -410,9 +438,8 @@ def generate_frames(faceCascade):
 
 @app.route('/face_feed_model')
 def face_feed_model():
-    faceCascade = cv2.CascadeClassifier("./models/haarcascade_frontalface_alt.xml")
-
-    response = Response(generate_frames(faceCascade), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # 얼굴 검출은 공유 face_tracker가 N 프레임마다 한 번, 그 사이는 추적
+    response = Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
 
@@ -427,13 +454,15 @@ def face_feed():
 
 @atexit.register
 def release_capture():
-    cap.release()
+    emotion_worker.stop()
+    camera.stop()
+    attention_batcher.stop()
 
 if __name__ == '__main__':
+    attention_models.preload()
+    attention_batcher.start()
     info, inlet = load_realtime_eeg_data()
-    samples, timestamps = inlet.pull_chunk(timeout=1.0, max_samples=4)
-    
-    if timestamps:
-        global_sample = [row[3:17] for row in samples]
+    acquisition = LSLAcquisition(inlet, eeg_ring, channels=slice(3, 17), sfreq=SFREQ)
+    acquisition.start()
         
     app.run(host='0.0.0.0', port='5000', debug=False)
\ No newline at end of file
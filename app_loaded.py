@@ -1,28 +1,17 @@
 import cv2
-from flask import Flask, Response, render_template, request
+from flask import Flask, Response, render_template, request, jsonify, abort
 import io
 from diffusers import StableDiffusionControlNetPipeline, ControlNetModel, UniPCMultistepScheduler
 import torch
 from controlnet_aux import OpenposeDetector
 import atexit
 import numpy as np
-from deepface import DeepFace
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 import json
-import mne
-import matplotlib.pyplot as plt
-import scipy
 from flask_cors import CORS
 import torch
 from flask import Flask, Response, render_template, stream_with_context
 import time
-from mne import create_info
-from scipy import signal
-import pickle
-from joblib import load
-import matplotlib as mpl
 from PIL import Image
-import matplotlib.cm as cm
 from PyQt5 import QtWidgets
 import math
 import pylsl
@@ -33,137 +22,228 @@ from pylsl import StreamInlet, resolve_stream
 import warnings
 import os
 from utils.wrapper import StreamDiffusionWrapper
-import threading
+from utils.camera import CameraHub
+from utils.emotion import EMOTIONS, EmotionWorker
+from utils.face_tracker import FaceTracker
+from utils.frame_pipeline import FramePipeline
+from utils.model_registry import AttentionModelRegistry
+from utils.inference import AttentionBatcher
+from utils.pipelines import PipelineManager
+from utils.features import StreamingBandPower, extract_features, feature_window
+from utils.topomap import TopomapRenderer, topomap_meta
+from utils.eeg_stream import ENCODINGS, EEGEncoder, frame_sleep
+from utils.eeg_cache import load_cached_eeg, create_info as create_eeg_info
+from utils.replay import ReplayManager
 warnings.filterwarnings(action='ignore')
 
 # Flask 애플리케이션 생성
 app = Flask(__name__)
 CORS(app)
 
-# 웹캠 비디오 캡처 객체 생성
-cap = cv2.VideoCapture(0)
+# 웹캠 캡처 허브 생성 (모든 영상 피드가 하나의 캡처 스레드를 공유)
+camera = CameraHub(0)
 
-########################################🌟 MNE TOPOLOGY ###################################
-
-# Generate MNE topomaps
-def generate_mne():
-    global concatenated_data, info
+########################################🌟 REPLAY SESSIONS ###################################
 
-    plt.style.use("dark_background")
-    fig = plt.figure(figsize=(7, 4), facecolor='none')
-    ax = fig.add_subplot(111)
+DATA_DIR = "./datas"
+DEFAULT_SOURCE = "s01"
+DEFAULT_SESSION = "default"
 
+def load_eeg_data(source=DEFAULT_SOURCE, trial=0):
+    if os.path.basename(source) != source:
+        raise ValueError(f"Invalid recording name: {source}")
 
-    vmax = 20
-    vmin = -20
-    norm = mpl.colors.Normalize(vmin=vmin, vmax=vmax)
-    colormapping = cm.ScalarMappable(norm=norm, cmap='jet') #, cmap=cmap
+    mat_file = os.path.join(DATA_DIR, f"{source}.mat")
+    # 첫 실행 때 .npy + .json 캐시로 변환, 이후에는 memmap으로 바로 로드
+    concatenated_data, meta = load_cached_eeg(
+        mat_file, os.path.join(DATA_DIR, "cache", f"{source}_trial{trial}.npy"), layout="deap",
+        trial=trial, start=384, description=f"{source.upper()} subject")
+    info = create_eeg_info(meta)
 
-    buffer_size = 1
-    eeg_buffer = np.zeros((14, buffer_size))
+    return info, concatenated_data
 
-    time_step = 0
-    cb = fig.colorbar(colormapping, ax=plt.gca(), location='right', pad=0.04)
-    
-    while True:
-        if time_step >= concatenated_data.shape[1]:
-            time_step = 0
-
-        ax.clear()
-
-        mne.viz.plot_topomap(
-            concatenated_data[:32, time_step],
-            info,
-            vlim=(vmin, vmax),
-            axes=ax,
-            show=False,
-            outlines='head',
-            cmap='jet',
-            sensors=False,
-            contours=0
+# 세션 id별 재생 세션 (같은 녹화는 세션끼리 memmap 공유), 모든 피드는 ?session= 으로 세션 선택
+replay = ReplayManager(load_eeg_data)
+
+def get_replay_session():
+    try:
+        return replay.get(request.args.get("session", DEFAULT_SESSION))
+    except KeyError as e:
+        abort(404, description=str(e))
+
+def replay_params():
+    return request.get_json(silent=True) or request.args
+
+@app.route('/replay/sessions', methods=['GET', 'POST'])
+def replay_sessions():
+    if request.method == 'GET':
+        return jsonify(replay.sessions())
+
+    params = replay_params()
+    try:
+        session = replay.open(
+            params.get('source', DEFAULT_SOURCE),
+            session_id=params.get('session'),
+            speed=float(params.get('speed', 1.0)),
+            start=float(params.get('start', 0.0)),
+            trial=int(params.get('trial', 0)),
         )
+    except FileNotFoundError as e:
+        return jsonify(error=str(e)), 404
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except RuntimeError as e:
+        return jsonify(error=str(e)), 503
+
+    return jsonify(session.status()), 201
+
+# GET: 상태, POST: {"seek": 초, "speed": 배속, "paused": true/false}, DELETE: 세션 종료
+@app.route('/replay/sessions/<session_id>', methods=['GET', 'POST', 'DELETE'])
+def replay_session(session_id):
+    try:
+        session = replay.get(session_id)
+    except KeyError as e:
+        return jsonify(error=str(e)), 404
+
+    if request.method == 'DELETE':
+        replay.close(session_id)
+        return jsonify(closed=session_id)
+
+    if request.method == 'POST':
+        params = replay_params()
+        try:
+            if 'speed' in params:
+                session.set_speed(float(params['speed']))
+            if 'seek' in params:
+                session.seek(float(params['seek']))
+            if 'paused' in params:
+                paused = params['paused']
+                if isinstance(paused, str):
+                    paused = paused.lower() in ('1', 'true', 'yes')
+                if paused:
+                    session.pause()
+                else:
+                    session.resume()
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+
+    return jsonify(session.status())
+
+########################################🌟 MNE TOPOLOGY ###################################
+
+MNE_FRAME_INTERVAL = 1 / 30  # topomap 최대 30 fps
+MNE_VLIM = (-20, 20)
 
-        canvas = FigureCanvas(fig)
-        buf = io.BytesIO()
-        canvas.print_png(buf)
-        buf.seek(0)
+# Generate MNE topomaps
+def generate_mne(session):
+    # 몽타주 기반 보간 행렬/컬러맵/머리 윤곽을 한 번만 계산
+    renderer = TopomapRenderer(session.info, vlim=MNE_VLIM)
+    
+    while not session.closed:
+        frame_start = time.time()
 
-        time_step += 1
+        # 세션 시계의 현재 샘플을 그림 (EEG/attention 피드와 같은 위치)
+        png = renderer.render_png(session.sample(session.position())[:32])
         
         yield (b'--frame\r\n'
-            b'Content-Type: image/png\r\n\r\n' + buf.read() + b'\r\n')
+            b'Content-Type: image/png\r\n\r\n' + png + b'\r\n')
+
+        time.sleep(max(0.0, MNE_FRAME_INTERVAL - (time.time() - frame_start)))
+
+
+# Stream topomap channel values only; mne_feed.html interpolates and draws them
+def generate_mne_data(session):
+    meta = topomap_meta(session.info, vlim=MNE_VLIM)
+    yield f"event: meta\ndata:{json.dumps(meta)}\n\n"
+
+    while not session.closed:
+        frame_start = time.time()
+
+        values = np.round(session.sample(session.position())[:32], 3).tolist()
+
+        json_data = json.dumps({'values': values})
+        yield f"data:{json_data}\n\n"
 
+        time.sleep(max(0.0, MNE_FRAME_INTERVAL - (time.time() - frame_start)))
 
 # Route to display MNE topomaps
 @app.route('/mne_feed_model')
 def mne_feed_model():
     #info, inlet = load_realtime_eeg_data()
-    response = Response(generate_mne(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    session = get_replay_session()
+    response = Response(generate_mne(session), mimetype='multipart/x-mixed-replace; boundary=frame')
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
     
     return response
 
+@app.route('/mne_feed_data')
+def mne_feed_data():
+    session = get_replay_session()
+    response = Response(stream_with_context(generate_mne_data(session)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+
+    return response
+
 @app.route('/mne_feed')
 def mne_feed():
-    return render_template('mne_feed.html')
+    # 기본은 브라우저 렌더링(data), ?mode=png 이면 서버 렌더링 PNG 스트림
+    return render_template('mne_feed.html', mode=request.args.get('mode', 'data'),
+                           replay_session=request.args.get('session'))
 
 ########################################🌟 EEG PLOT ###################################
-def load_eeg_data():
-    mat_file = "./datas/s01.mat"
-    mat = scipy.io.loadmat(mat_file)
-    data = mat["data"][0, :, 384:]
-    sfreq = 128
-    ch_names = [
-    "Fp1", "AF3", "F3", "F7", "FC5", "FC1", "C3", "T7", "CP5", "CP1",
-    "P3", "P7", "PO3", "O1", "Oz", "Pz", "Fp2", "AF4", "Fz", "F4",
-    "F8", "FC6", "FC2", "Cz", "C4", "T8", "CP6", "CP2", "P4", "P8",
-    "PO4", "O2", "hEOG", "vEOG", "zEMG", "tEMG", "GSR", "Respiration belt", "Plethysmograph", "Temperature"]
-
-    info = mne.create_info(
-        ch_names,
-        sfreq,
-        ch_types=["eeg"] * 32
-        + ["eog"] * 2
-        + ["emg"] * 2
-        + ["gsr"] * 1
-        + ["resp"] * 1
-        + ["misc"] * 1
-        + ["temperature"] * 1,
-    )
+EEG_FRAME_RATE = 20  # SSE 이벤트/초, 이벤트마다 그 사이의 모든 샘플을 묶어서 전송
+EEG_MAX_FRAME_RATE = 60  # ?fps 상한
 
-    info.set_montage("standard_1020")
-    info["description"] = "SO1 subject"
 
-    concatenated_data = data
-    return info, concatenated_data
+def pull_data(session, start, stop):
+    # 녹화 끝에 도달하면 처음부터 반복 재생
+    block = session.window(start, stop) * 1e4
 
+    return block
 
-def pull_data(concatenated_data, time_step):
-    sample = concatenated_data[:, time_step] * 1e4
 
-    return sample
+def generate_data(session, frame_rate=EEG_FRAME_RATE, encoding="json"):
+    sfreq = session.sfreq
+    encoder = EEGEncoder(session.info["ch_names"], sfreq, encoding,
+                         calibration=pull_data(session, 0, int(sfreq)))
+    yield encoder.header_event()
 
+    time_step = session.position()
+    generation = session.generation
 
-def generate_data():
-    global concatenated_data
-    time_step = 0
+    while not session.closed:
+        frame_start = time.monotonic()
+        due = session.position(frame_start)
 
-    while True:
-        sample = pull_data(concatenated_data, time_step).tolist()
-        time_step += 1
-        json_data = json.dumps({"time": time_step, "value": sample})
+        # seek 후에는 건너뛴 구간을 보내지 않고 현재 위치부터 다시 전송
+        if session.generation != generation or due < time_step:
+            generation = session.generation
+            time_step = due
 
-        yield f"data:{json_data}\n\n"
-        time.sleep(0.03)
+        if due > time_step:
+            block = pull_data(session, time_step, due)
+            event = encoder.encode(time_step, time_step / sfreq, block)
+            time_step = due
 
-        if time_step > concatenated_data.shape[1]:
-            time_step = 0
+            yield event
+
+        frame_sleep(frame_start, frame_rate)
 
 @app.route("/eeg_feed_model")
 def eeg_feed_model():
+    frame_rate = request.args.get("fps", EEG_FRAME_RATE, type=float)
+    if not 0 < frame_rate <= EEG_MAX_FRAME_RATE:
+        return f"fps must be in (0, {EEG_MAX_FRAME_RATE}], but got {frame_rate}", 400
+    # json(기본) | f32 | i16 : base64 바이너리 프레임은 대역폭을 크게 줄임
+    encoding = request.args.get("encoding", "json")
+    if encoding not in ENCODINGS:
+        return f"Unknown encoding: {encoding}", 400
+
+    session = get_replay_session()
     response = Response(
-        stream_with_context(generate_data()),
+        stream_with_context(generate_data(session, frame_rate, encoding)),
         mimetype="text/event-stream",
     )
     
@@ -175,7 +255,8 @@ def eeg_feed_model():
 
 @app.route("/eeg_feed")
 def eeg_feed():
-    return render_template("eeg_feed.html")
+    return render_template("eeg_feed.html", encoding=request.args.get("encoding", "json"),
+                           replay_session=request.args.get("session"))
 
 
 ########################################🌟 ATTENTION PLOT ###################################
@@ -187,122 +268,73 @@ BAND_PASS_LOW = 0.16
 TIME_WINDOW = 1
 
 select_ch = ['F7', 'F3', 'AF4', 'P7', 'P8', 'O1', 'O2']
-use_channel_inds = []
 diff_focus = "focus" 
 
-# Apply a Butterworth high-pass filter
-def butter_highpass(cutoff, fs, order=5):
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = signal.butter(order, normal_cutoff, btype='high', analog=False)
-    return b, a
-
-# Apply a high-pass filter to EEG data
-def butter_highpass_filter(data, cutoff, fs, order=5):
-    b, a = butter_highpass(cutoff, fs, order=order)
-    x = signal.filtfilt(b, a, data)
-    y = signal.filtfilt(b, a, x)
-    return y
-
-# Extract features from EEG data
-def extract_features(concatenated_eeg, time_window, time_points, window_blackman):
-    col = len(select_ch) #7
-    power_eeg = {}
-    bin_eeg = {}
-    bin_eeg_avg = {}
-    knn_focus ={}
-
-    power_eeg['data']=np.zeros([7, 513, time_window+1])
-    bin_eeg['data']=np.zeros([7, 36, time_window+1])
-    bin_eeg_avg['data']=np.zeros([7, 36, 1])
-    knn_focus['data']=np.zeros([252,1])
-
-    if concatenated_eeg.shape[0] < time_points:
-        original_array = np.random.rand(concatenated_eeg.shape[0],7)
-        additional_values = np.random.rand(time_points - concatenated_eeg.shape[0], 7)
-        concatenated_eeg = np.concatenate((original_array, additional_values))
+# 시간 창별 scaler/KNN 모델을 한 번만 로드해 메모리에 유지 (fast: 학습 행렬 기반 BLAS KNN, sklearn과 예측 일치 확인 후 사용)
+attention_models = AttentionModelRegistry('./models', backend='fast')
+ATTENTION_HOP = 0.125  # estimator=streaming 의 기본 hop (초)
 
-    else:
-        pass
-    
-    for i in range(col):
-        concatenated_eeg[:,i] = butter_highpass_filter(concatenated_eeg[:,i], 0.16, 128, 5)
-        f, t, y1=scipy.signal.stft(concatenated_eeg[:,i],fs=128, window=window_blackman, nperseg=128, 
-                      noverlap=0, nfft=1024, detrend=False,return_onesided=True, boundary='zeros',
-                      padded=True)
-        
-        power_eeg['data'][i,:, :]=(np.abs(y1))**2
-        
-    for chn in range(col):
-        j=0
-        for i in range(1,144,4):
-            bin_eeg['data'][chn,j,:]=np.average(power_eeg['data'][chn,i:i+4,:],axis=0)
-            j+=1
-
-    for chn in range(col):
-        j=0
-        for k in range(0,1):
-            bin_eeg_avg['data'][chn,:,j]=np.average(bin_eeg['data'][chn,:,k:k+(601-time_window+1)],axis=1)
-            j += 1
-
-    for j in range(1):      
-        knn_focus['data'][:,j]=bin_eeg_avg['data'][:,:,j].reshape(1,-1)
-
-    knn_focus['data'] = 10*np.log(knn_focus['data'])
-    if time_window == 15:
-        loaded_scaler = load('./models/scaler_knn.joblib')
-        with open('./models/saved_model', 'rb') as f:
-            mod = pickle.load(f)
-
-    elif time_window == 5:
-        loaded_scaler = load('./models/scaler_knn_5second.joblib')
-        with open('./models/saved_model_5second', 'rb') as f:
-            mod = pickle.load(f)
-
-    elif time_window == 10:
-        loaded_scaler = load('./models/scaler_knn_10second.joblib')
-        with open('./models/saved_model_10second', 'rb') as f:
-            mod = pickle.load(f)
-
-    elif time_window == 1:
-        loaded_scaler = load('./models/scaler_knn_1second.joblib')
-        with open('./models/saved_model_1second', 'rb') as f:
-            mod = pickle.load(f)
-
-    return knn_focus['data'].T,loaded_scaler, mod
-
-def get_attention():
-    global concatenated_data, focus
-    time_step = 0
+# 모든 세션/브라우저의 attention 요청을 ~5 ms 동안 모아 한 번에 transform + predict
+attention_batcher = AttentionBatcher(attention_models, max_wait=0.005)
+
+def get_attention(session, hop=None, streaming=None):
+    global diff_focus
     time_points = TIME_WINDOW * SFREQ
-    t_win = np.arange(0, 128)
-    buffer_size = 1
-    M = 12
-    window_blackman = 0.42 - 0.5 * np.cos((2 * np.pi * t_win) / (M - 1)) + 0.08 * np.cos((4 * np.pi * t_win) / (M - 1))
+    window_blackman = feature_window()
+    use_channel_inds = [session.info["ch_names"].index(ch) for ch in select_ch]
+    # hop(초)마다 겹치는 창으로 추정, 기본은 0.5초마다
+    interval = 0.5 if hop is None else hop
+    last_step = None
+    generation = session.generation
 
-    while True:
-        if time_step > concatenated_data.shape[1]:
-            time_step = 0
+    while not session.closed:
+        # 세션의 현재 위치에서 끝나는 time_points 구간
+        time_step = session.position()
 
-        samples = concatenated_data[:, time_step:time_step + time_points]
-        time_step += time_points
+        if streaming is None:
+            samples = session.window(time_step - time_points, time_step)
 
-        samples = np.array([row for row in samples]).T
-        realtime_data = samples[use_channel_inds, :]
+            realtime_data = samples[use_channel_inds, :]
 
-        realtime_data, loaded_scaler, mod = extract_features(realtime_data.T, TIME_WINDOW, time_points, window_blackman)
-        realtime_data_scaled = loaded_scaler.transform(realtime_data)
-        
-        value = mod.predict(realtime_data_scaled)[0]
-        focus = "focus" if value == 0 else ("unfocus" if value == 1 else ("drowsy" if value == 2 else "unknown"))
+            realtime_data = extract_features(realtime_data.T, TIME_WINDOW, time_points, window_blackman)
+        else:
+            # 처음이나 seek 후에는 상태를 비우고 필터 안정화 구간(10초)부터 다시 채움
+            if last_step is None or session.generation != generation or time_step < last_step:
+                streaming.reset()
+                generation = session.generation
+                last_step = time_step - time_points - 10 * SFREQ
+
+            streaming.update(session.window(last_step, time_step)[use_channel_inds, :])
+            last_step = time_step
+            realtime_data = streaming.features()
+
+        value = attention_batcher.predict(TIME_WINDOW, realtime_data)
+        session_focus = "focus" if value == 0 else ("unfocus" if value == 1 else ("drowsy" if value == 2 else "unknown"))
+        session.state["focus"] = session_focus
+        # 기본 세션의 집중 상태가 diffusion/StreamDiffusion prompt에 반영됨
+        if session.session_id == DEFAULT_SESSION:
+            diff_focus = session_focus
 
         yield f"data: {value}\n\n"
         
-        time.sleep(0.5)  # Pause for 0.5 seconds before the next update
+        time.sleep(interval)
 
 @app.route('/attention_feed_model')
 def attention_feed_model():
-    response = Response(stream_with_context(get_attention()), mimetype="text/event-stream")
+    session = get_replay_session()
+    # ?hop=0.125 : 125 ms마다 겹치는 창으로 추정, &estimator=streaming : 증분 밴드 파워(근사)
+    hop = request.args.get('hop', type=float)
+    if hop is not None and not hop >= 1 / SFREQ:
+        return f"hop must be at least one sample (1/{SFREQ} s), but got {hop}", 400
+    streaming = None
+    if request.args.get('estimator', 'exact') == 'streaming':
+        try:
+            streaming = StreamingBandPower(len(select_ch), TIME_WINDOW,
+                                           hop=int(round((hop or ATTENTION_HOP) * SFREQ)))
+        except ValueError as e:
+            return str(e), 400
+
+    response = Response(stream_with_context(get_attention(session, hop, streaming)), mimetype="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
 
@@ -310,18 +342,22 @@ def attention_feed_model():
 
 @app.route('/attention_feed')
 def attention_feed():
-    return render_template('attention_feed.html')
+    return render_template('attention_feed.html', replay_session=request.args.get('session'))
 
 
 ########################################🌟 DIFFUSION MODEL ###################################
 cmd = "Character"
 
-def generate_images(openpose, pipe):
-    global cmd, diff_focus, diff_emotion
+# ControlNet/StreamDiffusion 파이프라인을 첫 요청 때 한 번만 만들어 모든 요청이 공유
+pipelines = PipelineManager()
+
+def generate_images():
+    global cmd, diff_focus
     success = True
     
     focus_cmd = "strongly"
     emotion_cmd  = "happy"
+    seq = 0
 
     while success:
         if diff_focus == "drowsy" or diff_focus == "unfocus":
@@ -329,17 +365,21 @@ def generate_images(openpose, pipe):
         else:
             focus_cmd = "strongly"
 
-        emotion_cmd = diff_emotion
-        ret, frame = cap.read()
+        emotion_cmd = emotion_worker.dominant
+        seq, frame = camera.wait(seq)
+        if frame is None:
+            break
 
-        pose_img = openpose(frame)
+        # 파이프라인은 모든 시청자가 공유하므로 한 프레임씩 번갈아 생성
+        with pipelines.use("controlnet") as (openpose, pipe):
+            pose_img = openpose(frame)
 
-        image_output = pipe(f"{focus_cmd} + ' ' + {emotion_cmd}, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single girl character, art like, very high quality",
-                            pose_img,
-                            negative_prompt="normal quality, low quality, worst quality, jpeg artifacts, chinese, username, watermark, signature, time signature,\
+            image_output = pipe(f"{focus_cmd} + ' ' + {emotion_cmd}, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single girl character, art like, very high quality",
+                                pose_img,
+                                negative_prompt="normal quality, low quality, worst quality, jpeg artifacts, chinese, username, watermark, signature, time signature,\
                                             timestamp, artist name, copyright name, copyright, loli, child, infant, baby, bad anatomy, extra hands, extra legs, extra digits, \
                                             extra_fingers, wrong finger, inaccurate limb, African American, African, tits, nipple, pubic hair",
-                            num_inference_steps=2).images[0]
+                                num_inference_steps=2).images[0]
         combined_img = np.concatenate((pose_img, image_output), axis=1)
         combined_pil_img = Image.fromarray(combined_img)
 
@@ -352,9 +392,8 @@ def generate_images(openpose, pipe):
         yield (b'--frame\r\n'
             b'Content-Type: image/jpeg\r\n\r\n' + img_bytes + b'\r\n')
 
-@app.route('/diffusion_feed_model', methods=['GET'])
-def diffusion_feed_model():
-    # OpenPose 모델 및 Diffusion 초기화
+def build_controlnet_pipeline():
+    # OpenPose 모델 및 Diffusion 초기화 (프로세스당 한 번)
     openpose = OpenposeDetector.from_pretrained('lllyasviel/ControlNet')
     controlnet = ControlNetModel.from_pretrained("lllyasviel/control_v11p_sd15_openpose", torch_dtype=torch.float16)
     pipe = StableDiffusionControlNetPipeline.from_pretrained("runwayml/stable-diffusion-v1-5", controlnet=controlnet, safety_checker=None, torch_dtype=torch.float16)
@@ -362,7 +401,19 @@ def diffusion_feed_model():
     pipe.enable_model_cpu_offload(gpu_id=0)
     pipe.enable_xformers_memory_efficient_attention()
 
-    response = Response(generate_images(openpose, pipe), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return openpose, pipe
+
+pipelines.register("controlnet", build_controlnet_pipeline)
+
+@app.route('/diffusion_feed_model', methods=['GET'])
+def diffusion_feed_model():
+    # 첫 요청만 모델 로드를 기다리고, 이후 요청은 같은 파이프라인을 공유
+    try:
+        pipelines.get("controlnet")
+    except Exception as e:
+        return f"Error: Could not load the diffusion pipeline: {e}", 503
+
+    response = Response(generate_images(), mimetype='multipart/x-mixed-replace; boundary=frame')
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
 
@@ -375,72 +426,55 @@ def diffusion_feed():
 
 ########################################🌟 CAMERA THREAD ###################################
 
-cap = None  # 웹캠 캡처 객체
-
-def start_camera():
-    """웹캠 캡처를 별도의 스레드에서 실행"""
-    global cap
-    cap = cv2.VideoCapture(0)  # 웹캠 열기
-    if not cap.isOpened():
-        print("Error: Could not open webcam.")
-        return
-
-# 웹캠 캡처 스레드 시작
-camera_thread = threading.Thread(target=start_camera)
-camera_thread.daemon = True
-camera_thread.start()
+# 웹캠 캡처 스레드 시작 (장치는 스레드 안에서 열림)
+camera.start()
 
 ########################################🌟 STREAMDIFFUSION MODEL ###################################
 
-def generate_streamdiffusion_images(stream):
-    global diff_focus, diff_emotion
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+def build_prompt(focus, emotion):
+    # 사용자 상태 기반으로 prompt 생성 ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+    focus_cmd = "drowsy" if focus in ["drowsy", "unfocus"] else "strongly focused"
+    emotion_cmd = emotion
+    if emotion_cmd in ["angry"]:
+        dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of The Joker halloween costume, {emotion_cmd} face painting, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single girl character, art like, very high quality"
+    elif emotion_cmd in ["disgust"]:
+        dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of The green {emotion_cmd} face costume, face painting, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
+    elif emotion_cmd in ["fear"]:
+        dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of The Scream of Nature, face painting, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
+    elif emotion_cmd in ["sad"]:
+        dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of the sad person, crying, blue, tears, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
+    else:
+        dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
 
-        # Save frame to temporary file
-        temp_input_path = "temp_input.png"
-        cv2.imwrite(temp_input_path, frame)
+    return dynamic_prompt
 
-        # 사용자 상태 기반으로 prompt 생성 ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
-        focus_cmd = "drowsy" if diff_focus in ["drowsy", "unfocus"] else "strongly focused"
-        emotion_cmd = diff_emotion if diff_emotion else "neutral"
-        if emotion_cmd in ["angry"]:
-            dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of The Joker halloween costume, {emotion_cmd} face painting, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single girl character, art like, very high quality"
-        elif emotion_cmd in ["disgust"]:
-            dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of The green {emotion_cmd} face costume, face painting, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
-        elif emotion_cmd in ["fear"]:
-            dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of The Scream of Nature, face painting, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
-        elif emotion_cmd in ["happy", "surprise", "neutral"]:
-            dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
-        elif emotion_cmd in ["sad"]:
-            dynamic_prompt = f"{focus_cmd}, {emotion_cmd}, Portrait of the sad person, crying, blue, tears, beautiful, highly insanely detailed, top quality, best quality, 4k, 8k, art single {emotion_cmd} girl character, art like, very high quality"
+def streamdiffusion_prompt():
+    return build_prompt(diff_focus, emotion_worker.dominant)
 
+def infer_streamdiffusion(frame):
+    # 공유 StreamDiffusionWrapper를 호출하여 결과 생성 (한 번에 한 프레임)
+    with pipelines.use("streamdiffusion") as stream:
+        # BGR 프레임을 그대로 넘기면 래퍼가 GPU에서 변환/리사이즈하고 uint8 BGR 프레임을 반환 (output_type="bgr")
+        return stream(image=frame, prompt=streamdiffusion_prompt())
 
-        # StreamDiffusionWrapper를 호출하여 결과 생성
-        output_image = stream(image=temp_input_path, prompt=dynamic_prompt)
+# 캡처 -> 추론 -> JPEG 인코딩/전송을 각각의 스레드로 겹쳐 실행 (큐가 차면 가장 오래된 프레임을 버림)
+streamdiffusion_server = FramePipeline(camera, infer_streamdiffusion)
 
-        # Convert PIL image to OpenCV format
-        output_image_cv = cv2.cvtColor(np.array(output_image), cv2.COLOR_RGB2BGR)
+def generate_streamdiffusion_images():
+    seq = 0
 
-        # Convert OpenCV image to JPEG
-        _, buffer = cv2.imencode('.jpg', output_image_cv)
-        frame = buffer.tobytes()
+    while True:
+        seq, frame = streamdiffusion_server.wait(seq, timeout=1.0)
+        if frame is None:
+            if not camera.is_opened() or not streamdiffusion_server.running:
+                break
+            continue
 
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
-        # Clean up temporary file
-        if os.path.exists(temp_input_path):
-            os.remove(temp_input_path)
-
-@app.route('/streamdiffusion_feed_model', methods=['GET'])
-def streamdiffusion_feed_model():
-    global diff_focus, diff_emotion
-
-    # Prepare StreamDiffusionWrapper
+def build_streamdiffusion():
+    # StreamDiffusionWrapper 로드 + warmup (프로세스당 한 번)
     stream = StreamDiffusionWrapper(
         model_id_or_path="stabilityai/sd-turbo",
         t_index_list=[27],
@@ -450,6 +484,7 @@ def streamdiffusion_feed_model():
         warmup=10,
         acceleration="xformers",
         mode="img2img",
+        output_type="bgr",
         use_denoising_batch=True,
         cfg_type="self",
         seed=123,
@@ -462,43 +497,65 @@ def streamdiffusion_feed_model():
         num_inference_steps=50,
         guidance_scale=1.0,
         delta=1.0,
+        # 집중 상태 x 감정 조합의 prompt를 미리 인코딩 -> 상태가 바뀌어도 텍스트 인코더를 다시 돌리지 않음
+        prompts={build_prompt(focus, emotion) for focus in ["focus", "drowsy"] for emotion in EMOTIONS},
     )
 
-    if cap is None or not cap.isOpened():
+    return stream
+
+pipelines.register("streamdiffusion", build_streamdiffusion)
+
+@app.route('/streamdiffusion_feed_model', methods=['GET'])
+def streamdiffusion_feed_model():
+    if not camera.is_opened():
         return "Error: Could not open webcam."
 
-    return Response(generate_streamdiffusion_images(stream), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # 첫 요청만 모델 로드를 기다리고, 이후 요청은 같은 StreamDiffusion을 공유
+    try:
+        pipelines.get("streamdiffusion")
+    except Exception as e:
+        return f"Error: Could not load the StreamDiffusion pipeline: {e}", 503
+    streamdiffusion_server.start()
+
+    return Response(generate_streamdiffusion_images(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/streamdiffusion_feed')
 def streamdiffusion_feed():
     return render_template('streamdiffusion_feed.html')
 
+@app.route('/streamdiffusion_status')
+def streamdiffusion_status():
+    # 단계별(capture/inference/encode) fps, 버려진 프레임 수, 캡처부터 전송까지의 지연
+    return jsonify(streamdiffusion_server.stats())
+
 ########################################🌟 EMOTION RECOGNITION ###################################
 
-diff_emotion = "happy"
-emotions = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+EMOTION_FPS = 5  # DeepFace 분석 최대 횟수/초 (시청자 수와 무관)
+FACE_DETECT_EVERY = 10  # 얼굴 전체 검출 주기(프레임), 그 사이는 템플릿 매칭으로 추적
+
+# 얼굴 피드와 감정 워커가 공유하는 얼굴 위치 추적기 (프레임 seq별로 한 번만 계산)
+face_tracker = FaceTracker("./models/haarcascade_frontalface_alt.xml", detect_every=FACE_DETECT_EVERY)
+
+# 최신 카메라 프레임만 분석하는 공유 감정 인식 워커, 모든 구독자와 프롬프트 생성이 결과를 읽음
+# 시작하자마자 DeepFace 감정 모델/얼굴 검출기를 미리 로드(warmup)
+emotion_worker = EmotionWorker(camera, target_fps=EMOTION_FPS, default="happy", face_tracker=face_tracker)
+emotion_worker.start()
 
 @app.route('/emotion_feed_model')
 def emotion_feed_model():
     def generate_emotion_data():
-        global diff_emotion
-        success = True
-
-        while success:
-            success, frame = cap.read()
-            if success:
-                # Perform emotion analysis
-                predictions = DeepFace.analyze(frame, actions=['emotion'], detector_backend="opencv", enforce_detection=False, silent=True)
-                emotion_data = predictions[0]['emotion']
-                probabilities = [emotion_data[emotion] for emotion in emotions]
+        seq = 0
 
-                max_probability_index = probabilities.index(max(probabilities))
-                max_emotion = emotions[max_probability_index]
+        while True:
+            seq, probabilities = emotion_worker.wait(seq, timeout=5.0)
+            if probabilities is None:
+                # 새 결과가 없으면 연결 확인용 주석만 전송
+                yield ": keepalive\n\n"
+                continue
 
-                diff_emotion = max_emotion
-                # Create JSON data to send to the front-end
-                json_data = json.dumps({'emotions': emotions, 'probabilities': probabilities})
-                yield f"data:{json_data}\n\n"
+            # Create JSON data to send to the front-end
+            json_data = json.dumps({'emotions': EMOTIONS, 'probabilities': probabilities})
+            yield f"data:{json_data}\n\n"
 
     response = Response(generate_emotion_data(), mimetype="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
@@ -509,6 +566,25 @@ def emotion_feed_model():
 def emotion_feed():
     return render_template('emotion_feed.html')
 
+########################################🌟 READINESS ###################################
+
+READY_COMPONENTS = ["emotion", "attention"]
+
+# 대시보드가 모델 warmup 완료 여부를 확인하는 엔드포인트 (준비되면 200, 아니면 503)
+@app.route('/ready')
+def ready():
+    loaded = attention_models.loaded()
+    components = {
+        "emotion": emotion_worker.readiness(),
+        # 피드가 쓰는 TIME_WINDOW 모델이 로드되어야 준비 완료
+        "attention": {"state": "ready" if TIME_WINDOW in loaded else "cold", "time_windows": loaded},
+        # 생성 파이프라인은 첫 요청 때 로드되므로 로드 상태만 보고하고 준비 여부에는 포함하지 않음
+        "diffusion": pipelines.readiness(),
+    }
+    is_ready = all(components[name]["state"] == "ready" for name in READY_COMPONENTS)
+
+    return jsonify(ready=is_ready, components=components), 200 if is_ready else 503
+
 ########################################🌟 POSE ESTIMATION ###################################
 
 # def generate_frames(faceCascade):
@@ -544,9 +620,10 @@ def emotion_feed():
 ########################################🌟 VIDEO ###################################
 
 def generate_frames():
+    seq = 0
     while True:
-        success, frame = cap.read()
-        if not success:
+        seq, frame = camera.wait(seq)
+        if frame is None:
             break
         else:
             ret, buffer = cv2.imencode('.jpg', frame)
@@ -567,9 +644,15 @@ def video_feed():
 
 @atexit.register
 def release_capture():
-    cap.release()
+    streamdiffusion_server.stop()
+    emotion_worker.stop()
+    camera.stop()
+    attention_batcher.stop()
 
 if __name__ == '__main__':
-    info, concatenated_data = load_eeg_data()
+    attention_models.preload()
+    attention_batcher.start()
+    # ?session= 없이 접속하는 피드가 사용하는 기본 재생 세션
+    replay.open(DEFAULT_SOURCE, session_id=DEFAULT_SESSION)
 
     app.run(host='0.0.0.0', port='5000', debug=False)
\ No newline at end of file
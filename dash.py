@@ -1,6 +1,9 @@
+import time
 import requests
 import streamlit as st
 
+SERVER_URL = "http://localhost:5000"
+
 st.set_page_config(
     page_title="MIND",
     page_icon="🍋",
@@ -119,6 +122,27 @@ card_css = """
 """
 
 
+# Flask 서버의 모델 warmup(/ready)이 끝날 때까지 대기, 첫 카드가 멈춰 보이지 않도록
+def wait_for_models(timeout=120):
+    if st.session_state.get("models_ready"):
+        return True
+
+    with st.spinner("Warming up models..."):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if requests.get(f"{SERVER_URL}/ready", timeout=2).status_code == 200:
+                    st.session_state["models_ready"] = True
+                    return True
+            except requests.RequestException:
+                pass
+            time.sleep(1)
+
+    return False
+
+if not wait_for_models():
+    st.warning("Models are still warming up, some cards may take a while to start.")
+
 cols = st.columns([1, 1])
 
 st.markdown(card_css, unsafe_allow_html=True)
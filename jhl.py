@@ -3,14 +3,12 @@ import sys
 from typing import Literal, Dict, Optional
 import fire
 import cv2
-import numpy as np
 import torch
 from diffusers import LCMScheduler, StableDiffusionControlNetPipeline, ControlNetModel
 from diffusers.utils import load_image
 from controlnet_aux import OpenposeDetector
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 from utils.wrapper import StreamDiffusionWrapper
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 def main(
     model_id_or_path: str = "stabilityai/sd-turbo", #"stabilityai/sd-turbo", "stabilityai/sdxl-turbo"
     lora_dict: Optional[Dict[str, float]] = None,
@@ -70,6 +68,7 @@ def main(
         warmup=10,
         acceleration=acceleration,
         mode="img2img",
+        output_type="bgr",
         use_denoising_batch=use_denoising_batch,
         cfg_type=cfg_type,
         seed=seed,
@@ -91,21 +90,15 @@ def main(
             if not ret:
                 print("Error: Could not read frame from webcam.")
                 break
-            # Save frame to temporary file
-            temp_input_path = os.path.join(CURRENT_DIR, "temp_input.png")
-            cv2.imwrite(temp_input_path, frame)
-            output_image = stream(image=temp_input_path)
-            # Convert PIL image to OpenCV format
-            output_image_cv = cv2.cvtColor(np.array(output_image), cv2.COLOR_RGB2BGR)
-            # Display the output image
-            cv2.imshow('Output', output_image_cv)
+            # Pass the BGR frame directly, the wrapper converts it on the device
+            output_image = stream(image=frame)
+            # Display the output image (already a uint8 BGR frame)
+            cv2.imshow('Output', output_image)
             # Exit loop if 'q' is pressed
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
     finally:
         cap.release()
         cv2.destroyAllWindows()
-        if os.path.exists(temp_input_path):
-            os.remove(temp_input_path)
 if __name__ == "__main__":
     fire.Fire(main)
\ No newline at end of file
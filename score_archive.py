@@ -0,0 +1,76 @@
+import glob
+import os
+import time
+from typing import Literal, Optional
+
+import fire
+
+from utils.scoring import score_archive, write_timeline
+
+
+def main(
+    archive_dir: str,
+    output: str = "attention_archive.parquet",
+    pattern: str = "**/*.mat",
+    time_window: int = 1,
+    workers: Optional[int] = None,
+    checkpoint_dir: Optional[str] = None,
+    hop: Optional[float] = None,
+    layout: Literal["deap", "emotiv"] = "deap",
+    trial: int = 0,
+    start: int = 0,
+    model_dir: str = "./models",
+    batch_size: int = 256,
+    backend: str = "fast",
+):
+    """
+    Re-scores a whole archive of recordings on every core.
+
+    Parameters
+    ----------
+    archive_dir : str
+        The directory holding the recordings.
+    output : str, optional
+        The .parquet or .csv results table, by default "attention_archive.parquet".
+    pattern : str, optional
+        The glob of the recordings inside ``archive_dir``, by default "**/*.mat".
+    time_window : int, optional
+        The window length in seconds, one of 1, 5, 10, 15, by default 1.
+    workers : Optional[int], optional
+        The number of worker processes, by default one per CPU.
+    checkpoint_dir : Optional[str], optional
+        Where finished recordings are checkpointed, by default
+        "<output>.checkpoints". Re-running the same command resumes.
+    hop : Optional[float], optional
+        Seconds between window starts, by default ``time_window``.
+    layout : Literal["deap", "emotiv"], optional
+        The .mat layout, by default "deap".
+    trial : int, optional
+        The DEAP trial to score, by default 0.
+    start : int, optional
+        Samples to skip at the start of every recording, by default 0.
+    model_dir : str, optional
+        The directory holding the scaler/model files, by default "./models".
+    batch_size : int, optional
+        Windows per feature extraction call, by default 256.
+    backend : str, optional
+        "fast" or "sklearn" KNN inference, by default "fast".
+    """
+    recordings = sorted(glob.glob(os.path.join(archive_dir, pattern), recursive=True))
+    if not recordings:
+        raise FileNotFoundError(f"No recordings matching {pattern} in {archive_dir}")
+
+    if checkpoint_dir is None:
+        checkpoint_dir = f"{output}.checkpoints"
+
+    t0 = time.perf_counter()
+    results = score_archive(recordings, checkpoint_dir, time_window, model_dir, workers,
+                            layout, trial, start, hop, batch_size, backend, archive_dir)
+    write_timeline(results, output)
+
+    print(f"Scored {results['recording'].nunique()} recordings ({len(results)} windows) "
+          f"in {time.perf_counter() - t0:.1f}s -> {output}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,75 @@
+import os
+import time
+from typing import Literal, Optional
+
+import fire
+
+from utils.model_registry import AttentionModelRegistry
+from utils.scoring import load_recording, score_recording, write_timeline
+
+
+def main(
+    recording: str,
+    output: Optional[str] = None,
+    time_window: int = 1,
+    hop: Optional[float] = None,
+    layout: Literal["deap", "emotiv"] = "deap",
+    trial: int = 0,
+    start: int = 0,
+    model_dir: str = "./models",
+    batch_size: int = 256,
+    backend: str = "fast",
+):
+    """
+    Scores the attention state of a whole recording offline.
+
+    Parameters
+    ----------
+    recording : str
+        A .mat recording, or a .npy cache written by utils.eeg_cache.
+    output : Optional[str], optional
+        The .csv or .parquet timeline to write, by default
+        "<recording>_attention_<time_window>s.csv".
+    time_window : int, optional
+        The window length in seconds, one of 1, 5, 10, 15, by default 1.
+    hop : Optional[float], optional
+        Seconds between window starts, by default ``time_window``.
+    layout : Literal["deap", "emotiv"], optional
+        The .mat layout, see utils.eeg_cache.read_mat, by default "deap".
+    trial : int, optional
+        The DEAP trial to score, by default 0.
+    start : int, optional
+        Samples to skip at the start (384 skips the DEAP baseline),
+        by default 0.
+    model_dir : str, optional
+        The directory holding the scaler/model files, by default "./models".
+    batch_size : int, optional
+        Windows per feature extraction call, by default 256.
+    backend : str, optional
+        "fast" or "sklearn" KNN inference, see AttentionModelRegistry,
+        by default "fast".
+    """
+    if output is None:
+        output = f"{os.path.splitext(recording)[0]}_attention_{time_window}s.csv"
+
+    t0 = time.perf_counter()
+    data, meta = load_recording(recording, layout, trial)
+    data = data[:, start:]
+
+    scaler, model = AttentionModelRegistry(model_dir, backend=backend).get(time_window)
+    t1 = time.perf_counter()
+
+    timeline = score_recording(data, meta["ch_names"], scaler, model, time_window,
+                               sfreq=meta["sfreq"], hop=hop, batch_size=batch_size)
+    t2 = time.perf_counter()
+
+    write_timeline(timeline, output)
+
+    duration = data.shape[1] / meta["sfreq"]
+    print(f"Scored {len(timeline)} windows ({duration:.0f}s of EEG) in {t2 - t1:.2f}s "
+          f"(load {t1 - t0:.2f}s) -> {output}")
+    print(timeline["state"].value_counts(normalize=True).round(3).to_string())
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from pylsl import StreamInlet, local_clock
+
+from utils.ring_buffer import RingBuffer
+
+
+class LSLAcquisition:
+    def __init__(
+        self,
+        inlet: StreamInlet,
+        ring: RingBuffer,
+        channels: slice = slice(3, 17),
+        sfreq: float = 128,
+        max_chunk: int = 1024,
+        pull_timeout: float = 0.2,
+        clock_sync_interval: float = 5.0,
+        late_threshold: float = 0.5,
+    ):
+        """
+        Background thread that drains an LSL inlet into a ring buffer,
+        independently of any HTTP client.
+
+        Timestamps are corrected to the local clock with
+        ``inlet.time_correction``, which is refreshed every
+        ``clock_sync_interval`` seconds.
+
+        Parameters
+        ----------
+        inlet : StreamInlet
+            The inlet returned by ``load_realtime_eeg_data``.
+        ring : RingBuffer
+            The buffer the EEG channels are written to.
+        channels : slice, optional
+            The EEG columns of each LSL sample, by default slice(3, 17)
+            (the 14 Emotiv channels).
+        sfreq : float, optional
+            The nominal sampling rate used to detect gaps, by default 128.
+        max_chunk : int, optional
+            The maximum number of samples per pull, by default 1024.
+        pull_timeout : float, optional
+            Seconds a pull waits for data, by default 0.2.
+        clock_sync_interval : float, optional
+            Seconds between clock offset updates, by default 5.0.
+        late_threshold : float, optional
+            Samples older than this many seconds on arrival count as late,
+            by default 0.5.
+        """
+        self.inlet = inlet
+        self.ring = ring
+        self.channels = channels
+        self.sfreq = sfreq
+        self.max_chunk = max_chunk
+        self.pull_timeout = pull_timeout
+        self.clock_sync_interval = clock_sync_interval
+        self.late_threshold = late_threshold
+
+        self.clock_offset = 0.0
+        self.received_samples = 0
+        self.dropped_samples = 0
+        self.late_samples = 0
+        self.last_timestamp: Optional[float] = None
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+        self._last_sync = -np.inf
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=self.pull_timeout + 1.0)
+            self._thread = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "running": self._running,
+            "received_samples": self.received_samples,
+            "dropped_samples": self.dropped_samples,
+            "late_samples": self.late_samples,
+            "clock_offset": self.clock_offset,
+            "write_index": self.ring.write_index,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def _sync_clock(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sync < self.clock_sync_interval:
+            return
+
+        self._last_sync = now
+        try:
+            self.clock_offset = self.inlet.time_correction(timeout=1.0)
+        except Exception as e:
+            print(f"LSL time correction failed: {e}")
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                self._pull()
+            except Exception as e:
+                # A lost stream or a bad chunk must not kill the thread silently
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"LSL acquisition failed: {e}")
+                time.sleep(1.0)
+
+    def _pull(self) -> None:
+        self._sync_clock()
+
+        samples, timestamps = self.inlet.pull_chunk(
+            timeout=self.pull_timeout, max_samples=self.max_chunk
+        )
+        if not timestamps:
+            return
+
+        chunk = np.asarray(samples, dtype=np.float32)[:, self.channels].T
+        stamps = np.asarray(timestamps, dtype=np.float64) + self.clock_offset
+
+        # Gaps longer than 1.5 sample periods mean samples never arrived
+        if self.last_timestamp is not None:
+            stamps_with_prev = np.concatenate(([self.last_timestamp], stamps))
+        else:
+            stamps_with_prev = stamps
+        gaps = np.diff(stamps_with_prev) * self.sfreq
+        self.dropped_samples += int(np.sum(np.round(gaps[gaps > 1.5]) - 1))
+
+        lag = local_clock() - stamps
+        self.late_samples += int(np.count_nonzero(lag > self.late_threshold))
+
+        self.received_samples += len(stamps)
+        self.last_timestamp = float(stamps[-1])
+        self.ring.write(chunk, stamps)
@@ -0,0 +1,137 @@
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+class CameraHub:
+    def __init__(self, device: Union[int, str] = 0, read_timeout: float = 2.0):
+        """
+        Owns a single cv2.VideoCapture and fans its frames out to any
+        number of consumers.
+
+        One background thread reads the device and keeps only the latest
+        frame together with a monotonically increasing sequence number.
+        Consumers never touch the device, so capture happens once per
+        frame no matter how many feeds are open.
+
+        Frames are shared between consumers and must be treated as
+        read-only; copy a frame before drawing on it.
+
+        Parameters
+        ----------
+        device : Union[int, str], optional
+            The cv2.VideoCapture device index or path, by default 0.
+        read_timeout : float, optional
+            Default number of seconds ``wait`` blocks for a new frame,
+            by default 2.0.
+        """
+        self.device = device
+        self.read_timeout = read_timeout
+
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._seq = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Starts the capture thread. The device is opened inside the thread
+        so this never blocks the caller.
+        """
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the capture thread and releases the device.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=self.read_timeout)
+            self._thread = None
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def is_opened(self) -> bool:
+        return self._running and self._cap is not None and self._cap.isOpened()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def read(self) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Returns the latest frame without waiting.
+
+        Returns
+        -------
+        Tuple[int, Optional[np.ndarray]]
+            The sequence number and the latest BGR frame, or None if no
+            frame has been captured yet.
+        """
+        with self._cond:
+            return self._seq, self._frame
+
+    def wait(
+        self, last_seq: int = 0, timeout: Optional[float] = None
+    ) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Blocks until a frame newer than ``last_seq`` is available.
+
+        Parameters
+        ----------
+        last_seq : int, optional
+            The sequence number the caller has already consumed,
+            by default 0.
+        timeout : Optional[float], optional
+            Seconds to wait, by default ``read_timeout``.
+
+        Returns
+        -------
+        Tuple[int, Optional[np.ndarray]]
+            The new sequence number and frame. The frame is None if no new
+            frame arrived in time or the hub was stopped.
+        """
+        if timeout is None:
+            timeout = self.read_timeout
+
+        with self._cond:
+            has_new = self._cond.wait_for(
+                lambda: self._seq > last_seq or not self._running, timeout
+            )
+            if not has_new or self._seq <= last_seq:
+                return last_seq, None
+            return self._seq, self._frame
+
+    def _run(self) -> None:
+        self._cap = cv2.VideoCapture(self.device)
+        if not self._cap.isOpened():
+            print("Error: Could not open webcam.")
+            self._running = False
+            with self._cond:
+                self._cond.notify_all()
+            return
+
+        try:
+            while self._running:
+                success, frame = self._cap.read()
+                if not success:
+                    time.sleep(0.01)
+                    continue
+
+                with self._cond:
+                    self._frame = frame
+                    self._seq += 1
+                    self._cond.notify_all()
+        finally:
+            self._cap.release()
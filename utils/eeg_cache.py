@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+from typing import Any, Dict, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.io
+
+
+Layout = Literal["deap", "emotiv"]
+
+DEAP_CH_NAMES = [
+    "Fp1", "AF3", "F3", "F7", "FC5", "FC1", "C3", "T7", "CP5", "CP1",
+    "P3", "P7", "PO3", "O1", "Oz", "Pz", "Fp2", "AF4", "Fz", "F4",
+    "F8", "FC6", "FC2", "Cz", "C4", "T8", "CP6", "CP2", "P4", "P8",
+    "PO4", "O2", "hEOG", "vEOG", "zEMG", "tEMG", "GSR", "Respiration belt", "Plethysmograph", "Temperature"]
+DEAP_CH_TYPES = (
+    ["eeg"] * 32 + ["eog"] * 2 + ["emg"] * 2 + ["gsr"] * 1
+    + ["resp"] * 1 + ["misc"] * 1 + ["temperature"] * 1
+)
+EMOTIV_CH_NAMES = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def read_mat(
+    mat_path: str, layout: Layout = "deap", trial: int = 0
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Reads a recording in one of the two .mat layouts used by the apps.
+
+    ``deap``: DEAP ``sXX.mat``, ``data`` is (trial, channel, sample) at 128 Hz.
+    ``emotiv``: Emotiv export, ``o.data`` is (sample, column) with the 14
+    EEG channels in columns 3:17 and the rate in ``o.sampFreq``.
+
+    Returns
+    -------
+    Tuple[np.ndarray, Dict[str, Any]]
+        The (n_channels, n_samples) data and its metadata.
+    """
+    mat = scipy.io.loadmat(mat_path)
+
+    if layout == "deap":
+        n_trials = mat["data"].shape[0]
+        if not 0 <= trial < n_trials:
+            raise ValueError(f"trial must be in [0, {n_trials}), but got {trial}")
+        data = mat["data"][trial]
+        meta = {"sfreq": 128, "ch_names": DEAP_CH_NAMES, "ch_types": DEAP_CH_TYPES}
+    elif layout == "emotiv":
+        data = mat['o']['data'][0, 0][:, 3:17].T
+        sfreq = mat['o']['sampFreq'][0][0][0][0]
+        meta = {"sfreq": float(sfreq), "ch_names": EMOTIV_CH_NAMES,
+                "ch_types": ["eeg"] * len(EMOTIV_CH_NAMES)}
+    else:
+        raise ValueError(f"Unknown .mat layout: {layout}")
+
+    meta["montage"] = "standard_1020"
+    return data, meta
+
+
+def convert_mat(
+    mat_path: str,
+    cache_path: str,
+    layout: Layout = "deap",
+    trial: int = 0,
+    start: int = 0,
+    stop: Optional[int] = None,
+    channels: Optional[Sequence[str]] = None,
+    dtype: Optional[str] = None,
+    description: str = "",
+) -> Dict[str, Any]:
+    """
+    One-time conversion of a .mat recording into ``cache_path`` (.npy,
+    channels x samples) plus ``cache_path`` + ".json" metadata.
+
+    Parameters
+    ----------
+    mat_path : str
+        The source .mat file.
+    cache_path : str
+        The .npy file to write.
+    layout : Layout, optional
+        The .mat layout, see ``read_mat``, by default "deap".
+    trial : int, optional
+        The DEAP trial to keep, by default 0.
+    start, stop : int, optional
+        The sample range to keep, by default everything.
+    channels : Optional[Sequence[str]], optional
+        The channel names to keep, by default all.
+    dtype : Optional[str], optional
+        Store the samples with this dtype, by default the source dtype.
+    description : str, optional
+        Stored in the metadata and used as info["description"].
+
+    Returns
+    -------
+    Dict[str, Any]
+        The metadata that was written.
+    """
+    data, meta = read_mat(mat_path, layout, trial)
+    data = data[:, start:stop]
+
+    if channels is not None:
+        picks = [meta["ch_names"].index(ch) for ch in channels]
+        data = data[picks]
+        meta["ch_names"] = [meta["ch_names"][i] for i in picks]
+        meta["ch_types"] = [meta["ch_types"][i] for i in picks]
+
+    if dtype is not None:
+        data = data.astype(dtype)
+
+    meta.update({
+        "description": description,
+        "source": os.path.abspath(mat_path),
+        "source_mtime": os.path.getmtime(mat_path),
+        "selection": _selection(layout, trial, start, stop, channels),
+        "shape": list(data.shape),
+        "dtype": str(data.dtype),
+    })
+
+    # 같은 디렉터리의 고유한 임시 파일에 쓰고 os.replace: 메타데이터를 마지막에 바꾸므로
+    # 중간에 중단되거나 동시에 변환/읽기를 해도 데이터와 맞지 않는 메타데이터로 유효한 캐시가 되지 않음
+    cache_dir = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    data_fd, data_tmp = tempfile.mkstemp(dir=cache_dir, suffix=".npy.tmp")
+    meta_tmp = None
+    try:
+        with os.fdopen(data_fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(data))
+        meta_fd, meta_tmp = tempfile.mkstemp(dir=cache_dir, suffix=".json.tmp")
+        with os.fdopen(meta_fd, "w") as f:
+            json.dump(meta, f, indent=2)
+
+        try:
+            os.remove(cache_path + ".json")
+        except FileNotFoundError:
+            pass
+        os.replace(data_tmp, cache_path)
+        os.replace(meta_tmp, cache_path + ".json")
+    finally:
+        for tmp in (data_tmp, meta_tmp):
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    return meta
+
+
+def read_cache(cache_path: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Memory-maps a cache written by ``convert_mat``. Only the pages that are
+    actually read are loaded, so startup time and memory stay flat however
+    long the recording is.
+    """
+    with open(cache_path + ".json") as f:
+        meta = json.load(f)
+    return np.load(cache_path, mmap_mode="r"), meta
+
+
+def load_cached_eeg(
+    mat_path: str, cache_path: str, layout: Layout = "deap", **selection
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Returns the memory-mapped cache of ``mat_path``, converting it first if
+    the cache is missing, older than the .mat file or made with a
+    different selection.
+    """
+    if not _is_fresh(mat_path, cache_path, layout, selection):
+        print(f"Converting {mat_path} -> {cache_path}")
+        convert_mat(mat_path, cache_path, layout, **selection)
+    return read_cache(cache_path)
+
+
+def create_info(meta: Dict[str, Any]):
+    import mne
+
+    info = mne.create_info(meta["ch_names"], meta["sfreq"], ch_types=meta["ch_types"])
+    info.set_montage(meta.get("montage", "standard_1020"))
+    info["description"] = meta.get("description", "")
+    return info
+
+
+def _selection(layout, trial=0, start=0, stop=None, channels=None, **_) -> Dict[str, Any]:
+    return {"layout": layout, "trial": trial, "start": start, "stop": stop,
+            "channels": None if channels is None else list(channels)}
+
+
+def _is_fresh(mat_path: str, cache_path: str, layout: Layout, selection: Dict[str, Any]) -> bool:
+    if not (os.path.exists(cache_path) and os.path.exists(cache_path + ".json")):
+        return False
+
+    with open(cache_path + ".json") as f:
+        meta = json.load(f)
+
+    if os.path.exists(mat_path) and os.path.getmtime(mat_path) != meta.get("source_mtime"):
+        return False
+    return meta.get("selection") == _selection(layout, **selection) and \
+        meta.get("description") == selection.get("description", "")
+
+
+if __name__ == "__main__":
+    import fire
+
+    fire.Fire({"convert": convert_mat})
@@ -0,0 +1,129 @@
+import base64
+import json
+import time
+from typing import Any, Dict, Literal, Optional, Sequence
+
+import numpy as np
+
+
+Encoding = Literal["json", "f32", "i16"]
+ENCODINGS = ("json", "f32", "i16")
+
+
+class PlaybackClock:
+    def __init__(self, sfreq: float, start_index: int = 0, speed: float = 1.0):
+        """
+        Maps wall-clock time to a sample index so recorded data is replayed
+        exactly in real time, however long each loop iteration takes.
+
+        Parameters
+        ----------
+        sfreq : float
+            The sampling rate of the recording.
+        start_index : int, optional
+            The sample index at the moment the clock starts, by default 0.
+        speed : float, optional
+            Playback speed, 1.0 is real time, by default 1.0.
+        """
+        self.sfreq = sfreq
+        self.speed = speed
+        self._start_index = start_index
+        self._t0 = time.monotonic()
+
+    def due(self, now: Optional[float] = None) -> int:
+        """The number of samples that should have been played by now."""
+        if now is None:
+            now = time.monotonic()
+        return self._start_index + int((now - self._t0) * self.sfreq * self.speed)
+
+    def reset(self, start_index: int = 0) -> None:
+        self._start_index = start_index
+        self._t0 = time.monotonic()
+
+
+def frame_sleep(frame_start: float, frame_rate: float) -> None:
+    """Sleeps for whatever is left of one 1/frame_rate frame period."""
+    time.sleep(max(0.0, 1.0 / frame_rate - (time.monotonic() - frame_start)))
+
+
+class EEGEncoder:
+    def __init__(
+        self,
+        ch_names: Sequence[str],
+        sfreq: float,
+        encoding: Encoding = "json",
+        calibration: Optional[np.ndarray] = None,
+        headroom: float = 4.0,
+    ):
+        """
+        Encodes EEG sample blocks for the SSE stream.
+
+        ``json`` sends plain lists of floats. ``f32`` and ``i16`` send the
+        block as base64 little-endian float32 or int16, samples-major
+        (sample 0 of every channel, then sample 1, ...). The channel list,
+        sampling rate and int16 offset/scale go out once in ``header``.
+
+        Parameters
+        ----------
+        ch_names : Sequence[str]
+            The channel names, in the order of the block rows.
+        sfreq : float
+            The sampling rate.
+        encoding : Encoding, optional
+            "json", "f32" or "i16", by default "json".
+        calibration : Optional[np.ndarray], optional
+            Data of shape (n_channels, n_samples) used to choose the int16
+            per-channel offset (mean) and step. Required for "i16".
+        headroom : float, optional
+            The int16 range covers ``headroom`` times the largest deviation
+            seen in ``calibration``, by default 4.0. Larger values are
+            clipped.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}, but got {encoding}")
+
+        self.ch_names = list(ch_names)
+        self.sfreq = sfreq
+        self.encoding = encoding
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+        if encoding == "i16":
+            if calibration is None:
+                raise ValueError("i16 encoding needs calibration data.")
+            calibration = np.asarray(calibration, dtype=np.float64)
+            self.offset = calibration.mean(axis=1)
+            deviation = np.abs(calibration - self.offset[:, None]).max(axis=1)
+            self.scale = np.maximum(deviation * headroom / 32767, 1e-6)
+
+    def header(self) -> Dict[str, Any]:
+        return {
+            "ch_names": self.ch_names,
+            "sfreq": self.sfreq,
+            "encoding": self.encoding,
+            "offset": None if self.offset is None else self.offset.tolist(),
+            "scale": None if self.scale is None else self.scale.tolist(),
+        }
+
+    def header_event(self) -> str:
+        return f"event: header\ndata:{json.dumps(self.header())}\n\n"
+
+    def encode(self, time_step: int, t0: float, block: np.ndarray) -> str:
+        """
+        One SSE ``data:`` event for a (n_channels, n_samples) block starting
+        at sample ``time_step`` / time ``t0``.
+        """
+        frame: Dict[str, Any] = {"time": time_step, "t0": t0, "sfreq": self.sfreq}
+
+        if self.encoding == "json":
+            frame["values"] = block.T.tolist()
+        else:
+            if self.encoding == "f32":
+                packed = np.ascontiguousarray(block.T, dtype="<f4")
+            else:
+                quantized = np.round((block.T - self.offset) / self.scale)
+                packed = np.clip(quantized, -32768, 32767).astype("<i2")
+            frame["n"] = block.shape[1]
+            frame["data"] = base64.b64encode(packed.tobytes()).decode("ascii")
+
+        return f"data:{json.dumps(frame)}\n\n"
@@ -0,0 +1,208 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.camera import CameraHub
+from utils.face_tracker import FaceTracker
+
+
+EMOTIONS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+class EmotionWorker:
+    def __init__(
+        self,
+        camera: CameraHub,
+        target_fps: float = 5.0,
+        detector_backend: str = "opencv",
+        default: str = "happy",
+        face_tracker: Optional[FaceTracker] = None,
+    ):
+        """
+        Runs DeepFace emotion analysis on one background thread and
+        publishes the latest result to every reader.
+
+        The worker always analyzes the newest camera frame; frames that
+        arrive while an analysis is running are simply never picked up.
+        Analyses are spaced to at most ``target_fps`` per second, so the
+        cost is the same with one viewer, ten viewers or none.
+
+        DeepFace builds its emotion model and face detector lazily on the
+        first call, which takes seconds. The worker thread therefore
+        starts with ``warmup``, and ``readiness`` reports when it is done.
+
+        Parameters
+        ----------
+        camera : CameraHub
+            The shared camera capture.
+        target_fps : float, optional
+            The maximum number of analyses per second, by default 5.0.
+        detector_backend : str, optional
+            The DeepFace face detector, by default "opencv".
+        default : str, optional
+            The emotion reported before the first analysis, by default "happy".
+        face_tracker : Optional[FaceTracker], optional
+            If given, the face is located by the shared tracker and only
+            the cropped face is passed to DeepFace with
+            ``detector_backend="skip"``, by default None.
+        """
+        self.camera = camera
+        self.target_fps = target_fps
+        self.detector_backend = detector_backend
+        self.face_tracker = face_tracker
+
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._probabilities: Optional[List[float]] = None
+        self._dominant = default
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.analyses = 0
+        self.errors = 0
+        self.last_latency = 0.0
+
+        # cold -> warming -> ready | failed
+        self.state = "cold"
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @property
+    def dominant(self) -> str:
+        """The most probable emotion of the latest analysis."""
+        return self._dominant
+
+    def latest(self) -> Tuple[int, Optional[List[float]]]:
+        """The (seq, probabilities) of the latest analysis, without blocking."""
+        with self._cond:
+            return self._seq, self._probabilities
+
+    def wait(self, last_seq: int = 0, timeout: Optional[float] = None) -> Tuple[int, Optional[List[float]]]:
+        """
+        Blocks until a result newer than ``last_seq`` is published.
+
+        Returns
+        -------
+        Tuple[int, Optional[List[float]]]
+            The result seq and the probabilities in ``EMOTIONS`` order, or
+            ``(last_seq, None)`` on timeout or when the worker stops.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > last_seq or not self._running, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None
+            return self._seq, self._probabilities
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "running": self._running,
+            "analyses": self.analyses,
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+            "dominant": self._dominant,
+        }
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.warmup_error,
+        }
+
+    def warmup(self) -> bool:
+        """
+        Builds the emotion model and the face detector with one dummy
+        analysis, so the first real frame is not delayed.
+        """
+        self.state = "warming"
+        started = time.monotonic()
+        try:
+            self.analyze(np.zeros((224, 224, 3), dtype=np.uint8), self._backend())
+        except Exception as e:
+            self.state = "failed"
+            self.warmup_error = str(e)
+            print(f"Emotion model warmup failed: {e}")
+            return False
+
+        self.warmup_seconds = time.monotonic() - started
+        self.state = "ready"
+        print(f"Emotion model ready ({self.warmup_seconds:.1f}s)")
+        return True
+
+    def analyze(self, frame: np.ndarray, detector_backend: Optional[str] = None) -> List[float]:
+        """The emotion probabilities of one BGR frame, in ``EMOTIONS`` order."""
+        from deepface import DeepFace
+
+        if detector_backend is None:
+            detector_backend = self.detector_backend
+        predictions = DeepFace.analyze(frame, actions=['emotion'], detector_backend=detector_backend,
+                                       enforce_detection=False, silent=True)
+        emotion_data = predictions[0]['emotion']
+        return [float(emotion_data[emotion]) for emotion in EMOTIONS]
+
+    def _backend(self) -> str:
+        return self.detector_backend if self.face_tracker is None else "skip"
+
+    def _face(self, frame_seq: int, frame: np.ndarray) -> np.ndarray:
+        if self.face_tracker is None:
+            return frame
+
+        # 얼굴을 못 찾으면 전체 프레임을 그대로 분석 (detector 사용 시와 같은 동작)
+        box = self.face_tracker.locate(frame_seq, frame)
+        return frame if box is None else self.face_tracker.crop(frame, box)
+
+    def _publish(self, probabilities: List[float]) -> None:
+        with self._cond:
+            self._seq += 1
+            self._probabilities = probabilities
+            self._dominant = EMOTIONS[int(np.argmax(probabilities))]
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        if self.state != "ready":
+            self.warmup()
+
+        frame_seq = 0
+
+        while self._running:
+            started = time.monotonic()
+            frame_seq, frame = self.camera.wait(frame_seq, timeout=1.0)
+            if frame is None:
+                # 카메라가 멈췄으면 wait가 바로 반환되므로 잠시 쉬고 다시 시도
+                if not self.camera.is_opened():
+                    time.sleep(1.0)
+                continue
+
+            analysis_start = time.monotonic()
+            try:
+                probabilities = self.analyze(self._face(frame_seq, frame), self._backend())
+            except Exception as e:
+                self.errors += 1
+                print(f"Emotion analysis failed: {e}")
+                time.sleep(1.0)
+                continue
+
+            self.last_latency = time.monotonic() - analysis_start
+            self.analyses += 1
+            self.state = "ready"
+            self._publish(probabilities)
+
+            time.sleep(max(0.0, 1.0 / self.target_fps - (time.monotonic() - started)))
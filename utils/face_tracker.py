@@ -0,0 +1,132 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+
+class FaceTracker:
+    def __init__(
+        self,
+        cascade_path: str = "./models/haarcascade_frontalface_alt.xml",
+        detect_every: int = 10,
+        detect_scale: float = 0.5,
+        search_margin: float = 0.5,
+        min_score: float = 0.6,
+    ):
+        """
+        Localizes the main (largest) face of the camera stream: a full Haar
+        detection every ``detect_every`` frames, and cheap template
+        matching inside a small search region around the last box in
+        between.
+
+        Results are cached per camera frame ``seq``, so the face feed and
+        the emotion worker share one localization per frame, and frames
+        older than the last one used are never tracked.
+
+        Parameters
+        ----------
+        cascade_path : str, optional
+            The Haar cascade file, by default the one in ./models.
+        detect_every : int, optional
+            Frames between two full detections, by default 10.
+        detect_scale : float, optional
+            Full detections run on the frame resized by this factor,
+            by default 0.5.
+        search_margin : float, optional
+            The tracking search region extends the last box by this
+            fraction of its size on every side, by default 0.5.
+        min_score : float, optional
+            The minimum normalized correlation of a track; below it the
+            face counts as lost and the next frame runs a full detection,
+            by default 0.6.
+        """
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Could not load the face cascade: {cascade_path}")
+
+        self.detect_every = detect_every
+        self.detect_scale = detect_scale
+        self.search_margin = search_margin
+        self.min_score = min_score
+
+        self._lock = threading.Lock()
+        self._box: Optional[Box] = None
+        self._template: Optional[np.ndarray] = None
+        self._since_detect = 0
+        self._last_seq = -1
+
+        self.detections = 0
+        self.tracks = 0
+
+    def locate(self, seq: int, frame: np.ndarray) -> Optional[Box]:
+        """
+        The face box of camera frame ``seq``, or None if no face is found.
+
+        Consumers read the shared camera at their own pace, so a frame at
+        or below the last ``seq`` used (the same frame, or an older one
+        arriving late) returns the current box instead of moving the
+        tracking state backwards.
+        """
+        with self._lock:
+            if seq <= self._last_seq:
+                return self._box
+            self._last_seq = seq
+
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if self._box is not None and self._since_detect < self.detect_every:
+                self._since_detect += 1
+                self._box = self._track(gray)
+            else:
+                self._box = None
+
+            if self._box is None:
+                self._since_detect = 0
+                self._box = self._detect(gray)
+
+            if self._box is not None:
+                x, y, w, h = self._box
+                self._template = gray[y:y + h, x:x + w].copy()
+            return self._box
+
+    def crop(self, frame: np.ndarray, box: Box, padding: float = 0.1) -> np.ndarray:
+        """The face region of ``frame`` with ``padding`` (a fraction of the box) on every side."""
+        x, y, w, h = box
+        pad_x, pad_y = int(w * padding), int(h * padding)
+        height, width = frame.shape[:2]
+        return frame[max(0, y - pad_y):min(height, y + h + pad_y), max(0, x - pad_x):min(width, x + w + pad_x)]
+
+    def stats(self) -> Dict[str, int]:
+        return {"detections": self.detections, "tracks": self.tracks}
+
+    def _detect(self, gray: np.ndarray) -> Optional[Box]:
+        self.detections += 1
+        small = cv2.resize(gray, None, fx=self.detect_scale, fy=self.detect_scale,
+                           interpolation=cv2.INTER_AREA)
+        faces = self.cascade.detectMultiScale(small, 1.1, 5)
+        if len(faces) == 0:
+            return None
+
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        return tuple(int(round(v / self.detect_scale)) for v in (x, y, w, h))
+
+    def _track(self, gray: np.ndarray) -> Optional[Box]:
+        self.tracks += 1
+        x, y, w, h = self._box
+        margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+        left, top = max(0, x - margin_x), max(0, y - margin_y)
+        right = min(gray.shape[1], x + w + margin_x)
+        bottom = min(gray.shape[0], y + h + margin_y)
+
+        region = gray[top:bottom, left:right]
+        if region.shape[0] < h or region.shape[1] < w:
+            return None
+
+        scores = cv2.matchTemplate(region, self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if score < self.min_score:
+            return None
+        return left + dx, top + dy, w, h
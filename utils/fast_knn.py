@@ -0,0 +1,139 @@
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+class FastKNN:
+    def __init__(
+        self,
+        fit_X: np.ndarray,
+        y: np.ndarray,
+        classes: np.ndarray,
+        n_neighbors: int = 5,
+        weights: str = "uniform",
+        candidates: int = 16,
+    ):
+        """
+        Brute-force KNN classifier for batches of queries.
+
+        Distances to the whole training set are one float32 matrix product
+        (BLAS), from which the ``n_neighbors + candidates`` closest rows are
+        taken. Those candidates are re-ranked with exact float64 distances,
+        so the neighbours and the vote match sklearn's
+        ``KNeighborsClassifier`` with the euclidean metric.
+
+        Parameters
+        ----------
+        fit_X : np.ndarray
+            The training features, of shape (n_train, n_features).
+        y : np.ndarray
+            The class index (into ``classes``) of every training row.
+        classes : np.ndarray
+            The class labels.
+        n_neighbors : int, optional
+            The number of neighbours, by default 5.
+        weights : str, optional
+            "uniform" or "distance", like sklearn, by default "uniform".
+        candidates : int, optional
+            Extra float32 candidates re-ranked in float64, by default 16.
+        """
+        if weights not in ("uniform", "distance"):
+            raise ValueError(f"weights must be 'uniform' or 'distance', but got {weights}")
+
+        self._fit_X = np.ascontiguousarray(fit_X, dtype=np.float64)
+        self._fit_X32 = self._fit_X.astype(np.float32)
+        self._half_sq_norms = 0.5 * np.einsum("ij,ij->i", self._fit_X32, self._fit_X32)
+        self._y = np.asarray(y, dtype=np.intp)
+        self.classes_ = np.asarray(classes)
+        self.n_neighbors = min(n_neighbors, len(self._fit_X))
+        self.weights = weights
+        self.n_candidates = min(self.n_neighbors + candidates, len(self._fit_X))
+
+    @classmethod
+    def from_sklearn(cls, model: Any, **kwargs) -> "FastKNN":
+        """
+        Builds the backend from a fitted ``KNeighborsClassifier``, using its
+        training set and settings. Raises ValueError for models it cannot
+        reproduce exactly (other estimators, metrics or weights).
+        """
+        if not all(hasattr(model, attr) for attr in ("_fit_X", "_y", "classes_", "n_neighbors")):
+            raise ValueError(f"{type(model).__name__} is not a fitted KNeighborsClassifier")
+        if getattr(model, "outputs_2d_", False):
+            raise ValueError("Multi-output KNN models are not supported")
+
+        metric = getattr(model, "effective_metric_", model.metric)
+        if metric != "euclidean":
+            raise ValueError(f"Only the euclidean metric is supported, but the model uses {metric}")
+        if model.weights not in ("uniform", "distance"):
+            raise ValueError(f"Unsupported KNN weights: {model.weights}")
+
+        return cls(model._fit_X, model._y, model.classes_, model.n_neighbors, model.weights, **kwargs)
+
+    def kneighbors(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (distances, indices) of the nearest training rows of
+        every query, both of shape (n_queries, n_neighbors), closest first.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+
+        # |x - t|^2 / 2 - |x|^2 / 2 = |t|^2 / 2 - x.t, enough to rank the training rows
+        approx = self._half_sq_norms - X.astype(np.float32) @ self._fit_X32.T
+        if self.n_candidates < approx.shape[1]:
+            candidates = np.argpartition(approx, self.n_candidates - 1, axis=1)[:, :self.n_candidates]
+        else:
+            candidates = np.broadcast_to(np.arange(approx.shape[1]), approx.shape)
+
+        diff = self._fit_X[candidates] - X[:, None, :]
+        exact = np.einsum("ijk,ijk->ij", diff, diff)
+        order = np.argsort(exact, axis=1, kind="stable")[:, :self.n_neighbors]
+
+        indices = np.take_along_axis(candidates, order, axis=1)
+        distances = np.sqrt(np.take_along_axis(exact, order, axis=1))
+        return distances, indices
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        distances, indices = self.kneighbors(X)
+        labels = self._y[indices]
+
+        if self.weights == "uniform":
+            weights = np.ones_like(distances)
+        else:
+            # sklearn: an exact match takes all the weight
+            with np.errstate(divide="ignore"):
+                weights = 1.0 / distances
+            exact_match = np.isinf(weights)
+            rows = exact_match.any(axis=1)
+            weights[rows] = exact_match[rows]
+
+        votes = np.zeros((len(labels), len(self.classes_)))
+        np.add.at(votes, (np.arange(len(labels))[:, None], labels), weights)
+        return votes / votes.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # argmax picks the lowest class on ties, like sklearn's mode
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def agreement(model: Any, fast: FastKNN, X: np.ndarray) -> float:
+    """Fraction of the rows of ``X`` on which ``fast`` and ``model`` predict the same class."""
+    return float(np.mean(model.predict(X) == fast.predict(X)))
+
+
+def fast_knn_or_none(model: Any, validation: Optional[np.ndarray] = None, **kwargs) -> Optional[FastKNN]:
+    """
+    Converts ``model`` if it is supported and, when ``validation`` rows
+    are given, agrees with it on every one of them; returns None otherwise.
+    """
+    try:
+        fast = FastKNN.from_sklearn(model, **kwargs)
+    except ValueError as e:
+        print(f"FastKNN backend not used: {e}")
+        return None
+
+    if validation is not None:
+        score = agreement(model, fast, validation)
+        if score < 1.0:
+            print(f"FastKNN backend not used: agrees with the model on {score:.1%} of the validation rows")
+            return None
+
+    return fast
@@ -0,0 +1,235 @@
+import numpy as np
+from scipy import signal
+
+from utils.filters import StreamingFilter, filter_bank
+
+
+SFREQ = 128
+NPERSEG = 128
+NFFT = 1024
+# 513 one-sided STFT bins -> 36 bands of 4 bins starting at bin 1 (bins 1..144)
+FIRST_BIN = 1
+BAND_BINS = 4
+N_BANDS = 36
+
+
+def feature_window(nperseg=NPERSEG, M=12):
+    """Blackman-style STFT window used when the attention models were trained."""
+    t_win = np.arange(0, nperseg)
+    return 0.42 - 0.5 * np.cos((2 * np.pi * t_win) / (M - 1)) + 0.08 * np.cos((4 * np.pi * t_win) / (M - 1))
+
+
+# Apply a Butterworth high-pass filter (designed once, see utils.filters)
+def butter_highpass(cutoff, fs, order=5):
+    return filter_bank.ba(cutoff, fs, order=order, btype='high')
+
+
+# Apply a high-pass filter to EEG data
+def butter_highpass_filter(data, cutoff, fs, order=5, axis=-1):
+    b, a = butter_highpass(cutoff, fs, order=order)
+    x = signal.filtfilt(b, a, data, axis=axis)
+    y = signal.filtfilt(b, a, x, axis=axis)
+    return y
+
+
+def extract_features_batch(windows, time_window, window_blackman, sfreq=SFREQ, cutoff=0.16, order=5):
+    """
+    Computes attention features for many EEG windows at once.
+
+    Every window is high-pass filtered and transformed with a single
+    axis-aware filtfilt/STFT call, and the 4-bin band pooling is a
+    reshape + mean, so the result matches ``extract_features`` exactly.
+
+    Parameters
+    ----------
+    windows : np.ndarray
+        EEG windows of shape (n_windows, time_points, n_channels).
+    time_window : int
+        The window length in seconds the models were trained on.
+    window_blackman : np.ndarray
+        The STFT window, see ``feature_window``.
+
+    Returns
+    -------
+    np.ndarray
+        Features of shape (n_windows, n_channels * 36), channel-major.
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    n_windows, _, n_channels = windows.shape
+
+    eeg = np.ascontiguousarray(windows.transpose(0, 2, 1))
+    eeg = butter_highpass_filter(eeg, cutoff, sfreq, order, axis=-1)
+    _, _, spec = signal.stft(eeg, fs=sfreq, window=window_blackman, nperseg=NPERSEG,
+                             noverlap=0, nfft=NFFT, detrend=False, return_onesided=True,
+                             boundary='zeros', padded=True, axis=-1)
+
+    # (n_windows, n_channels, 513, n_segments)
+    power = np.abs(spec) ** 2
+    n_segments = power.shape[-1]
+
+    bands = power[:, :, FIRST_BIN:FIRST_BIN + N_BANDS * BAND_BINS, :]
+    bands = bands.reshape(n_windows, n_channels, N_BANDS, BAND_BINS, n_segments).mean(axis=3)
+    # keep the segment axis contiguous so numpy sums it in the same order as the per-channel loop
+    bands = np.ascontiguousarray(bands)
+    bands = bands[..., :601 - time_window + 1].mean(axis=-1)
+
+    return 10 * np.log(bands.reshape(n_windows, n_channels * N_BANDS))
+
+
+# Extract features from EEG data
+def extract_features(concatenated_eeg, time_window, time_points, window_blackman):
+    """Features of one (time_points, 7) window as a (1, 252) array."""
+    if concatenated_eeg.shape[0] < time_points:
+        original_array = np.random.rand(concatenated_eeg.shape[0], 7)
+        additional_values = np.random.rand(time_points - concatenated_eeg.shape[0], 7)
+        concatenated_eeg = np.concatenate((original_array, additional_values))
+
+    return extract_features_batch(concatenated_eeg[np.newaxis], time_window, window_blackman)
+
+
+class StreamingBandPower:
+    def __init__(
+        self,
+        n_channels,
+        time_window,
+        hop=16,
+        sfreq=SFREQ,
+        window_blackman=None,
+        cutoff=0.16,
+        order=5,
+    ):
+        """
+        Incremental version of ``extract_features`` for overlapping windows.
+
+        The batch features of a window are the mean band power of its
+        ``time_window + 1`` STFT segments: the first and last are half
+        zero padding, the others are full 128-sample segments spaced 128
+        samples apart. With ``hop`` dividing 64, every full segment of a
+        later window is one that already ended on an earlier hop, so each
+        hop only computes the segment ending now plus the two padded edge
+        segments (3 FFTs per channel) and keeps running sums of the stored
+        band powers. The cost per update does not depend on ``time_window``.
+
+        The STFT part is exact, but the features are an approximation of
+        ``extract_features``: the batch path high-passes every window on
+        its own with a double zero-phase ``filtfilt``, whose edge
+        transients leak into all bands through the feature window. A
+        stream can only be filtered once, causally; here with the same
+        magnitude response (the SOS filter cascaded four times, |H|^4).
+        On synthetic EEG the features differ by a median of about 6 dB for
+        1 s windows and 1 dB for 15 s windows, more in the lowest band, so
+        the attention models (trained on the batch features) are best fed
+        by ``extract_features`` whenever it is affordable.
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels of each update.
+        time_window : int
+            The window length in seconds, matching the attention model.
+        hop : int, optional
+            Samples between two estimates, must divide 64, by default 16
+            (125 ms at 128 Hz).
+        sfreq : float, optional
+            The sampling rate, by default 128.
+        window_blackman : np.ndarray, optional
+            The STFT window, by default ``feature_window()``.
+        cutoff : float, optional
+            The high-pass cutoff in Hz, by default 0.16.
+        order : int, optional
+            The Butterworth order, by default 5.
+        """
+        if (NPERSEG // 2) % hop != 0:
+            raise ValueError(f"hop must divide {NPERSEG // 2}, but got {hop}")
+
+        self.n_channels = n_channels
+        self.time_window = time_window
+        self.hop = hop
+        self.time_points = int(time_window * sfreq)
+        if window_blackman is None:
+            window_blackman = feature_window()
+        # scipy.signal.stft scaling
+        self._window = window_blackman / window_blackman.sum()
+
+        self._filter = StreamingFilter(np.vstack([filter_bank.sos(cutoff, sfreq, order)] * 4))
+        # filtered samples of the current window, written twice (like RingBuffer) so the
+        # window is always the contiguous view [pos, pos + time_points)
+        self._samples = np.zeros((n_channels, 2 * self.time_points))
+        self._pos = 0
+        self._pending = np.zeros((n_channels, 0))
+        # band powers of the full segments that ended on the last hops, in a circular buffer,
+        # and per hop phase the running sum of the last n_full of them (the ones a window uses)
+        self._hops_per_segment = NPERSEG // hop
+        self._n_full = self.time_points // NPERSEG - 1
+        self._history = np.zeros((self._n_full * self._hops_per_segment, n_channels, N_BANDS))
+        self._sums = np.zeros((self._hops_per_segment, n_channels, N_BANDS))
+        self.n_hops = 0
+        self.n_samples = 0
+
+    def reset(self) -> None:
+        self._filter.reset()
+        self._samples[:] = 0
+        self._pos = 0
+        self._pending = np.zeros((self.n_channels, 0))
+        self._history[:] = 0
+        self._sums[:] = 0
+        self.n_hops = 0
+        self.n_samples = 0
+
+    @property
+    def ready(self) -> bool:
+        """Whether a full ``time_window`` of samples has been seen."""
+        return self.n_samples >= self.time_points
+
+    def update(self, chunk) -> int:
+        """
+        Adds new samples of shape (n_channels, n) and returns the number of
+        hops completed. Samples short of a full hop wait for the next call.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.shape[1] == 0:
+            return 0
+
+        pending = np.concatenate([self._pending, self._filter.process(chunk, axis=-1)], axis=1)
+        n_hops = pending.shape[1] // self.hop
+        self._pending = pending[:, n_hops * self.hop:]
+
+        for i in range(n_hops):
+            block = pending[:, i * self.hop:(i + 1) * self.hop]
+            self._samples[:, self._pos:self._pos + self.hop] = block
+            self._samples[:, self._pos + self.time_points:self._pos + self.time_points + self.hop] = block
+            self._pos = (self._pos + self.hop) % self.time_points
+            self.n_samples += self.hop
+            self.n_hops += 1
+
+            if len(self._history):
+                # the segment leaving the running sum is the one this slot held
+                slot = self.n_hops % len(self._history)
+                band_power = self._band_power(self._window_samples()[:, -NPERSEG:])
+                self._sums[self.n_hops % self._hops_per_segment] += band_power - self._history[slot]
+                self._history[slot] = band_power
+
+        return n_hops
+
+    def features(self):
+        """The (1, n_channels * 36) features of the latest window."""
+        half = NPERSEG // 2
+        samples = self._window_samples()
+        first = np.zeros((self.n_channels, NPERSEG))
+        first[:, half:] = samples[:, :half]
+        last = np.zeros((self.n_channels, NPERSEG))
+        last[:, :half] = samples[:, -half:]
+
+        # full segments end 64, 192, ... samples before now: the running sum of their phase
+        full = self._sums[(self.n_hops - half // self.hop) % self._hops_per_segment]
+
+        bands = (self._band_power(first) + full + self._band_power(last)) / (self._n_full + 2)
+        return 10 * np.log(bands.reshape(1, self.n_channels * N_BANDS))
+
+    def _window_samples(self):
+        return self._samples[:, self._pos:self._pos + self.time_points]
+
+    def _band_power(self, segment):
+        power = np.abs(np.fft.rfft(segment * self._window, n=NFFT, axis=-1)) ** 2
+        bands = power[:, FIRST_BIN:FIRST_BIN + N_BANDS * BAND_BINS]
+        return bands.reshape(self.n_channels, N_BANDS, BAND_BINS).mean(axis=-1)
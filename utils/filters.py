@@ -0,0 +1,126 @@
+import threading
+from typing import Dict, Literal, Optional, Tuple
+
+import numpy as np
+from scipy import signal
+
+
+BType = Literal["low", "high", "band", "bandstop"]
+
+
+class StreamingFilter:
+    def __init__(self, sos: np.ndarray):
+        """
+        Causal SOS filter that keeps its ``zi`` state between chunks, so a
+        live stream can be filtered one newly arrived chunk at a time.
+
+        Parameters
+        ----------
+        sos : np.ndarray
+            The second-order sections of shape (n_sections, 6).
+        """
+        self.sos = sos
+        self.zi: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        self.zi = None
+
+    def process(self, chunk: np.ndarray, axis: int = -1) -> np.ndarray:
+        """
+        Filters one chunk, continuing from the state left by the previous
+        chunk. The first chunk starts from the steady state of its first
+        sample to avoid a start-up transient.
+
+        Parameters
+        ----------
+        chunk : np.ndarray
+            The new samples, time along ``axis``. Every chunk must have the
+            same shape apart from ``axis``.
+        axis : int, optional
+            The time axis, by default -1.
+
+        Returns
+        -------
+        np.ndarray
+            The filtered chunk.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.shape[axis] == 0:
+            return chunk
+
+        if self.zi is None:
+            axis = axis % chunk.ndim
+            shape = [1] * chunk.ndim
+            shape[axis] = 2
+            zi = signal.sosfilt_zi(self.sos).reshape([self.sos.shape[0]] + shape)
+            self.zi = zi * np.take(chunk, [0], axis=axis)
+
+        y, self.zi = signal.sosfilt(self.sos, chunk, axis=axis, zi=self.zi)
+        return y
+
+
+class FilterBank:
+    def __init__(self):
+        """
+        Designs each Butterworth filter once per (cutoff, fs, order, btype)
+        and keeps it in SOS form.
+        """
+        self._lock = threading.Lock()
+        self._sos: Dict[Tuple, np.ndarray] = {}
+        self._ba: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def sos(self, cutoff, fs: float, order: int = 5, btype: BType = "high") -> np.ndarray:
+        key = (_as_key(cutoff), fs, order, btype)
+        sos = self._sos.get(key)
+        if sos is None:
+            with self._lock:
+                sos = signal.butter(order, cutoff, btype=btype, fs=fs, output="sos")
+                self._sos[key] = sos
+        return sos
+
+    def ba(
+        self, cutoff, fs: float, order: int = 5, btype: BType = "high"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cached transfer-function (b, a) coefficients. Only for code that must
+        reproduce the BA-form filtering the attention models were trained
+        with; prefer ``sos`` everywhere else.
+        """
+        key = (_as_key(cutoff), fs, order, btype)
+        ba = self._ba.get(key)
+        if ba is None:
+            with self._lock:
+                nyq = 0.5 * fs
+                normal_cutoff = np.asarray(cutoff) / nyq
+                ba = signal.butter(order, normal_cutoff, btype=btype, analog=False)
+                self._ba[key] = ba
+        return ba
+
+    def filtfilt(
+        self,
+        data: np.ndarray,
+        cutoff,
+        fs: float,
+        order: int = 5,
+        btype: BType = "high",
+        axis: int = -1,
+    ) -> np.ndarray:
+        """
+        Zero-phase (forward-backward) filtering of a whole batch along ``axis``.
+        """
+        return signal.sosfiltfilt(self.sos(cutoff, fs, order, btype), data, axis=axis)
+
+    def streaming(
+        self, cutoff, fs: float, order: int = 5, btype: BType = "high"
+    ) -> StreamingFilter:
+        """
+        A new causal filter with its own persisted state.
+        """
+        return StreamingFilter(self.sos(cutoff, fs, order, btype))
+
+
+def _as_key(cutoff):
+    return tuple(np.atleast_1d(cutoff).tolist())
+
+
+filter_bank = FilterBank()
@@ -0,0 +1,248 @@
+import collections
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.camera import CameraHub
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize: int = 1):
+        """
+        Bounded hand-off queue between two pipeline stages. A put on a
+        full queue drops the oldest item instead of blocking the producer,
+        so a slow consumer always gets the newest items and the latency
+        stays bounded.
+        """
+        self._items: Deque[Any] = collections.deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item: Any) -> None:
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """The oldest queued item, or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RateMeter:
+    def __init__(self, window: float = 2.0):
+        """
+        Events per second over the last ``window`` seconds. ``tick`` and
+        ``rate`` may be called from different threads.
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._times: Deque[float] = collections.deque()
+        self.count = 0
+
+    def tick(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._times.append(now)
+            self.count += 1
+            self._expire(now)
+
+    def rate(self) -> float:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._times) / self.window
+
+    def _expire(self, now: float) -> None:
+        while self._times and self._times[0] < now - self.window:
+            self._times.popleft()
+
+
+def encode_jpeg(frame: np.ndarray) -> Optional[bytes]:
+    ret, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes() if ret else None
+
+
+class FramePipeline:
+    def __init__(
+        self,
+        camera: CameraHub,
+        infer: Callable[[np.ndarray], np.ndarray],
+        encode: Callable[[np.ndarray], Optional[bytes]] = encode_jpeg,
+        queue_size: int = 1,
+        idle_timeout: float = 5.0,
+    ):
+        """
+        Serves a frame-to-frame model as three overlapping stages, each on
+        its own thread:
+
+        capture -> [queue] -> inference -> [queue] -> encode/broadcast
+
+        While the model runs on frame n, the encoder compresses frame n-1
+        and the capture stage already holds frame n+1, so the GPU does not
+        wait for JPEG encoding or network I/O. The queues drop their oldest
+        frame when full, so a slow stage skips frames instead of building
+        up latency.
+
+        Encoded frames are published like ``CameraHub`` frames: any number
+        of viewers ``wait`` for the next one. Capture pauses when no viewer
+        has asked for a frame for ``idle_timeout`` seconds.
+
+        Parameters
+        ----------
+        camera : CameraHub
+            The shared camera capture.
+        infer : Callable[[np.ndarray], np.ndarray]
+            Maps a BGR camera frame to the BGR output frame.
+        encode : Callable[[np.ndarray], Optional[bytes]], optional
+            Compresses an output frame, by default JPEG.
+        queue_size : int, optional
+            The capacity of each hand-off queue, by default 1.
+        idle_timeout : float, optional
+            Seconds without viewers before capture pauses, by default 5.0.
+        """
+        self.camera = camera
+        self.infer = infer
+        self.encode = encode
+        self.idle_timeout = idle_timeout
+
+        self._captured = DropOldestQueue(queue_size)
+        self._inferred = DropOldestQueue(queue_size)
+        self._rates = {stage: RateMeter() for stage in ("capture", "inference", "encode")}
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._frame: Optional[bytes] = None
+        self._last_viewer = 0.0
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+        self.errors = 0
+        self.last_latency = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+
+            self._running = True
+            self._threads = [
+                threading.Thread(target=target, daemon=True)
+                for target in (self._capture, self._inference, self._broadcast)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def wait(self, last_seq: int = 0, timeout: Optional[float] = None) -> Tuple[int, Optional[bytes]]:
+        """
+        Blocks until an encoded frame newer than ``last_seq`` is published.
+
+        Returns
+        -------
+        Tuple[int, Optional[bytes]]
+            The frame seq and the encoded frame, or ``(last_seq, None)`` on
+            timeout or when the pipeline stops.
+        """
+        with self._cond:
+            self._last_viewer = time.monotonic()
+            self._cond.wait_for(lambda: self._seq > last_seq or not self._running, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None
+            return self._seq, self._frame
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "fps": {stage: rate.rate() for stage, rate in self._rates.items()},
+            "frames": {stage: rate.count for stage, rate in self._rates.items()},
+            "dropped": {"inference": self._captured.dropped, "encode": self._inferred.dropped},
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+        }
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self._last_viewer > self.idle_timeout
+
+    def _capture(self) -> None:
+        frame_seq = 0
+        while self._running:
+            try:
+                if self._idle():
+                    time.sleep(0.1)
+                    continue
+
+                frame_seq, frame = self.camera.wait(frame_seq, timeout=1.0)
+                if frame is None:
+                    # 카메라가 멈췄으면 wait가 바로 반환되므로 잠시 쉬고 다시 시도
+                    if not self.camera.is_opened():
+                        time.sleep(1.0)
+                    continue
+
+                self._captured.put((time.monotonic(), frame))
+                self._rates["capture"].tick()
+            except Exception as e:
+                self._failed("capture", e)
+
+    def _inference(self) -> None:
+        while self._running:
+            try:
+                item = self._captured.get(timeout=0.2)
+                if item is None:
+                    continue
+
+                captured_at, frame = item
+                output = self.infer(frame)
+
+                self._inferred.put((captured_at, output))
+                self._rates["inference"].tick()
+            except Exception as e:
+                self._failed("inference", e)
+
+    def _broadcast(self) -> None:
+        while self._running:
+            try:
+                item = self._inferred.get(timeout=0.2)
+                if item is None:
+                    continue
+
+                captured_at, output = item
+                frame_bytes = self.encode(output)
+                if frame_bytes is None:
+                    continue
+
+                with self._cond:
+                    self._frame = frame_bytes
+                    self._seq += 1
+                    self._cond.notify_all()
+                self.last_latency = time.monotonic() - captured_at
+                self._rates["encode"].tick()
+            except Exception as e:
+                self._failed("encode", e)
+
+    def _failed(self, stage: str, error: Exception) -> None:
+        # 예외로 단계 스레드가 죽지 않도록 기록만 하고 잠시 쉰 뒤 계속
+        self.errors += 1
+        print(f"Frame pipeline {stage} failed: {error}")
+        time.sleep(1.0)
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.model_registry import AttentionModelRegistry
+
+
+class AttentionBatcher:
+    def __init__(
+        self,
+        registry: AttentionModelRegistry,
+        max_wait: float = 0.005,
+        max_batch: int = 256,
+    ):
+        """
+        Micro-batching scheduler for attention inference.
+
+        Every stream submits its feature vector and gets a Future back. A
+        single worker thread collects the requests that arrive within
+        ``max_wait`` seconds of the first one and runs one
+        ``scaler.transform`` + ``model.predict`` per time window over the
+        whole batch, so the per-call overhead is paid once per batch
+        instead of once per session.
+
+        Parameters
+        ----------
+        registry : AttentionModelRegistry
+            Provides the (scaler, model) pair of each time window.
+        max_wait : float, optional
+            Seconds to wait for more requests after the first one,
+            by default 0.005.
+        max_batch : int, optional
+            The maximum number of requests per batch, by default 256.
+        """
+        self.registry = registry
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+
+        self.batches = 0
+        self.requests = 0
+
+        self._queue: "queue.Queue[Tuple[int, np.ndarray, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = False
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            self._start()
+
+    def stop(self) -> None:
+        """
+        Stops the worker for good. Requests still queued fail with a
+        RuntimeError instead of leaving their callers blocked, and later
+        ``submit`` calls raise.
+        """
+        with self._lock:
+            self._stopped = True
+            self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+        while True:
+            try:
+                _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("AttentionBatcher was stopped"))
+
+    def submit(self, time_window: int, features: np.ndarray) -> Future:
+        """
+        Queues one (1, n_features) or (n_features,) feature vector.
+        The Future resolves to its predicted label.
+        """
+        future: Future = Future()
+        with self._lock:
+            if not self._running:
+                self._start()
+            self._queue.put((time_window, np.asarray(features).reshape(-1), future))
+        return future
+
+    def predict(self, time_window: int, features: np.ndarray, timeout: Optional[float] = None) -> Any:
+        """Blocking ``submit``: the predicted label of one feature vector."""
+        return self.submit(time_window, features).result(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _start(self) -> None:
+        if self._stopped:
+            raise RuntimeError("AttentionBatcher was stopped")
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _collect(self) -> List[Tuple[int, np.ndarray, Future]]:
+        try:
+            batch = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            by_window: Dict[int, List[Tuple[np.ndarray, Future]]] = {}
+            for time_window, features, future in batch:
+                if future.set_running_or_notify_cancel():
+                    by_window.setdefault(time_window, []).append((features, future))
+
+            for time_window, requests in by_window.items():
+                try:
+                    scaler, model = self.registry.get(time_window)
+                    labels = model.predict(scaler.transform(np.stack([f for f, _ in requests])))
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+                    continue
+
+                for (_, future), label in zip(requests, labels):
+                    future.set_result(label)
+
+            self.batches += 1
+            self.requests += len(batch)
@@ -0,0 +1,133 @@
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from joblib import load
+
+from utils.fast_knn import fast_knn_or_none
+
+
+# time_window (seconds) -> (scaler file, model file)
+MODEL_FILES: Dict[int, Tuple[str, str]] = {
+    1: ("scaler_knn_1second.joblib", "saved_model_1second"),
+    5: ("scaler_knn_5second.joblib", "saved_model_5second"),
+    10: ("scaler_knn_10second.joblib", "saved_model_10second"),
+    15: ("scaler_knn.joblib", "saved_model"),
+}
+
+
+class AttentionModelRegistry:
+    def __init__(
+        self,
+        model_dir: str = "./models",
+        model_files: Optional[Dict[int, Tuple[str, str]]] = None,
+        check_interval: float = 1.0,
+        backend: str = "sklearn",
+    ):
+        """
+        Keeps the attention (scaler, model) pair of every time window in
+        memory and reloads a pair only when its files change on disk.
+
+        Parameters
+        ----------
+        model_dir : str, optional
+            The directory holding the scaler/model files, by default "./models".
+        model_files : Optional[Dict[int, Tuple[str, str]]], optional
+            Maps a time window to its (scaler file, model file) names,
+            by default MODEL_FILES.
+        check_interval : float, optional
+            Minimum number of seconds between two mtime checks of the same
+            time window, by default 1.0.
+        backend : str, optional
+            "sklearn" serves the pickled model as is. "fast" replaces KNN
+            models with a ``FastKNN`` built from their training set, after
+            checking that both agree on validation queries; other models
+            stay on sklearn. By default "sklearn".
+        """
+        if backend not in ("sklearn", "fast"):
+            raise ValueError(f"backend must be 'sklearn' or 'fast', but got {backend}")
+
+        self.model_dir = model_dir
+        self.model_files = dict(MODEL_FILES if model_files is None else model_files)
+        self.check_interval = check_interval
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        # time_window -> (mtimes, scaler, model)
+        self._entries: Dict[int, Tuple[Tuple[float, float], Any, Any]] = {}
+        self._last_check: Dict[int, float] = {}
+
+    def paths(self, time_window: int) -> Tuple[str, str]:
+        if time_window not in self.model_files:
+            raise ValueError(
+                f"No attention model for time_window={time_window}, "
+                f"expected one of {sorted(self.model_files)}"
+            )
+        scaler_file, model_file = self.model_files[time_window]
+        return (
+            os.path.join(self.model_dir, scaler_file),
+            os.path.join(self.model_dir, model_file),
+        )
+
+    def preload(self, time_windows: Optional[Iterable[int]] = None) -> None:
+        """
+        Loads the given time windows (all known windows by default).
+        Windows whose files are missing are reported and skipped.
+        """
+        if time_windows is None:
+            time_windows = self.model_files
+
+        for time_window in time_windows:
+            try:
+                self.get(time_window)
+            except FileNotFoundError as e:
+                print(f"Attention model for {time_window}s window not loaded: {e}")
+
+    def loaded(self) -> List[int]:
+        """The time windows whose models are in memory."""
+        return sorted(self._entries)
+
+    def get(self, time_window: int) -> Tuple[Any, Any]:
+        """
+        Returns the cached (scaler, model) pair of a time window, loading
+        it on first use or when either file has a newer mtime.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(time_window)
+        if entry is not None and now - self._last_check.get(time_window, 0.0) < self.check_interval:
+            return entry[1], entry[2]
+
+        with self._lock:
+            scaler_path, model_path = self.paths(time_window)
+            mtimes = (os.path.getmtime(scaler_path), os.path.getmtime(model_path))
+            self._last_check[time_window] = now
+
+            entry = self._entries.get(time_window)
+            if entry is None or entry[0] != mtimes:
+                scaler = load(scaler_path)
+                with open(model_path, "rb") as f:
+                    model = pickle.load(f)
+                if self.backend == "fast":
+                    model = self._fast_backend(model)
+                entry = (mtimes, scaler, model)
+                self._entries[time_window] = entry
+
+        return entry[1], entry[2]
+
+    @staticmethod
+    def _fast_backend(model: Any, n_validation: int = 256) -> Any:
+        fit_X = getattr(model, "_fit_X", None)
+        if fit_X is None:
+            print(f"FastKNN backend not used: {type(model).__name__} is not a KNN model")
+            return model
+
+        # 학습 샘플 쌍의 중점을 검증 쿼리로 사용 (실제 입력 분포와 비슷함)
+        rng = np.random.default_rng(0)
+        pairs = rng.integers(0, len(fit_X), size=(2, n_validation))
+        validation = 0.5 * (fit_X[pairs[0]] + fit_X[pairs[1]])
+
+        fast = fast_knn_or_none(model, validation)
+        return model if fast is None else fast
@@ -0,0 +1,93 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+
+class PipelineManager:
+    def __init__(self):
+        """
+        Process-wide holder of the heavy image generation pipelines.
+
+        Every pipeline is registered with a builder and built lazily, once,
+        on its first ``get``; later requests share the same instance
+        instead of loading gigabytes of weights per request. Generation
+        runs through ``use``, which serializes the calls to one pipeline,
+        since diffusers pipelines and StreamDiffusion keep per-call state.
+
+        The load state of every pipeline (cold -> loading -> ready | failed)
+        is reported by ``readiness``; a failed build is retried on the next
+        ``get``.
+        """
+        self._lock = threading.Lock()
+        self._builders: Dict[str, Callable[[], Any]] = {}
+        self._pipelines: Dict[str, Any] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._run_locks: Dict[str, threading.Lock] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, builder: Callable[[], Any]) -> None:
+        """Registers the builder of ``name``; it is only called on the first ``get``."""
+        with self._lock:
+            if name in self._builders:
+                raise ValueError(f"Pipeline already registered: {name}")
+
+            self._builders[name] = builder
+            self._build_locks[name] = threading.Lock()
+            self._run_locks[name] = threading.Lock()
+            self._status[name] = {"state": "cold", "load_seconds": None, "error": None}
+
+    def get(self, name: str) -> Any:
+        """
+        The pipeline ``name``, built on the first call. Concurrent callers
+        wait for the same build. Raises KeyError for unknown names and
+        re-raises the builder's exception if the build fails.
+        """
+        if name not in self._builders:
+            raise KeyError(f"Unknown pipeline: {name}")
+
+        pipeline = self._pipelines.get(name)
+        if pipeline is not None:
+            return pipeline
+
+        with self._build_locks[name]:
+            # 다른 요청이 기다리는 동안 이미 만들었을 수 있음
+            if name in self._pipelines:
+                return self._pipelines[name]
+
+            status = self._status[name]
+            status.update(state="loading", error=None)
+            started = time.monotonic()
+            try:
+                pipeline = self._builders[name]()
+            except Exception as e:
+                status.update(state="failed", error=str(e))
+                print(f"Pipeline {name} failed to load: {e}")
+                raise
+
+            status.update(state="ready", load_seconds=time.monotonic() - started)
+            print(f"Pipeline {name} ready ({status['load_seconds']:.1f}s)")
+            self._pipelines[name] = pipeline
+            return pipeline
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """Yields the pipeline ``name`` while holding its lock, one generation at a time."""
+        pipeline = self.get(name)
+        with self._run_locks[name]:
+            yield pipeline
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        The state of every pipeline and an overall state: failed or loading
+        if any pipeline is, ready once one is built, cold before that.
+        """
+        pipelines = {name: dict(status) for name, status in self._status.items()}
+        states = {status["state"] for status in pipelines.values()}
+        for state in ("failed", "loading", "ready"):
+            if state in states:
+                break
+        else:
+            state = "cold"
+
+        return {"state": state, "pipelines": pipelines}
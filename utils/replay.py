@@ -0,0 +1,231 @@
+import inspect
+import math
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.eeg_stream import PlaybackClock
+
+
+def _check_speed(speed: float) -> None:
+    # nan은 비교가 항상 False라 speed <= 0 검사를 통과하므로 따로 확인
+    if not math.isfinite(speed) or speed <= 0:
+        raise ValueError(f"speed must be positive and finite, but got {speed}")
+
+
+class ReplaySession:
+    def __init__(
+        self,
+        session_id: str,
+        source: str,
+        data: np.ndarray,
+        info: Any,
+        sfreq: float,
+        speed: float = 1.0,
+        start: float = 0.0,
+    ):
+        """
+        One replayed recording with its own clock. Every feed of the session
+        reads the cursor from here, so the EEG, topomap and attention
+        streams always show the same moment of the recording.
+
+        The cursor is an unwrapped sample index; reads wrap around the end
+        of the recording, so playback loops.
+
+        Parameters
+        ----------
+        session_id : str
+            The id clients pass as ``?session=``.
+        source : str
+            The name of the recording.
+        data : np.ndarray
+            The (n_channels, n_samples) recording, usually a memmap.
+        info : mne.Info
+            The measurement info of ``data``.
+        sfreq : float
+            The sampling rate of ``data``.
+        speed : float, optional
+            Playback speed, by default 1.0.
+        start : float, optional
+            Start position in seconds, by default 0.0.
+        """
+        self.session_id = session_id
+        self.source = source
+        self.data = data
+        self.info = info
+        self.sfreq = sfreq
+        self.n_samples = data.shape[1]
+        self.opened_at = time.time()
+        # 탐색(seek)할 때마다 증가, 스트림은 이 값이 바뀌면 현재 위치로 다시 맞춤
+        self.generation = 0
+        self.state: Dict[str, Any] = {}
+        # 세션이 닫히면 이 세션을 읽던 스트림이 종료됨
+        self.closed = False
+
+        self._lock = threading.Lock()
+        self._clock = PlaybackClock(sfreq, int(round(start * sfreq)), speed)
+        self._paused_at: Optional[int] = None
+
+    @property
+    def speed(self) -> float:
+        return self._clock.speed
+
+    @property
+    def paused(self) -> bool:
+        return self._paused_at is not None
+
+    def position(self, now: Optional[float] = None) -> int:
+        """The current (unwrapped) sample index of the session."""
+        with self._lock:
+            if self._paused_at is not None:
+                return self._paused_at
+            return self._clock.due(now)
+
+    def seek(self, seconds: float) -> None:
+        if not math.isfinite(seconds):
+            raise ValueError(f"seek position must be finite, but got {seconds}")
+
+        index = int(round(seconds * self.sfreq))
+        with self._lock:
+            if self._paused_at is not None:
+                self._paused_at = index
+            else:
+                self._clock.reset(index)
+            self.generation += 1
+
+    def pause(self) -> None:
+        with self._lock:
+            if self._paused_at is None:
+                self._paused_at = self._clock.due()
+
+    def resume(self) -> None:
+        with self._lock:
+            if self._paused_at is not None:
+                self._clock.reset(self._paused_at)
+                self._paused_at = None
+
+    def set_speed(self, speed: float) -> None:
+        _check_speed(speed)
+
+        with self._lock:
+            if self._paused_at is None:
+                self._clock.reset(self._clock.due())
+            self._clock.speed = speed
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        """Samples [start, stop) of every channel, wrapping around the end."""
+        return self.data[:, np.arange(start, stop) % self.n_samples]
+
+    def sample(self, index: int) -> np.ndarray:
+        return self.data[:, index % self.n_samples]
+
+    def status(self) -> Dict[str, Any]:
+        position = self.position()
+        return {
+            "session": self.session_id,
+            "source": self.source,
+            "position": (position % self.n_samples) / self.sfreq,
+            "duration": self.n_samples / self.sfreq,
+            "loops": position // self.n_samples,
+            "speed": self.speed,
+            "paused": self.paused,
+            "opened_at": self.opened_at,
+            **self.state,
+        }
+
+
+class ReplayManager:
+    def __init__(self, loader: Callable[..., Tuple[Any, np.ndarray]], max_sessions: int = 64):
+        """
+        Hosts many replay sessions in one process, keyed by session id.
+
+        Recordings are loaded once per source and shared by every session
+        replaying them, and released when the last such session closes.
+
+        Parameters
+        ----------
+        loader : Callable[..., Tuple[mne.Info, np.ndarray]]
+            Called as ``loader(source, **load_kwargs)``, returns
+            ``(info, data)`` like ``load_eeg_data``.
+        max_sessions : int, optional
+            The maximum number of open sessions, by default 64.
+        """
+        self.loader = loader
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, ReplaySession] = {}
+        self._recordings: Dict[Tuple, Tuple[Any, np.ndarray]] = {}
+        self._session_keys: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+
+    def open(
+        self,
+        source: str,
+        session_id: Optional[str] = None,
+        speed: float = 1.0,
+        start: float = 0.0,
+        **load_kwargs,
+    ) -> ReplaySession:
+        _check_speed(speed)
+        if not math.isfinite(start):
+            raise ValueError(f"start must be finite, but got {start}")
+
+        key = self._recording_key(source, load_kwargs)
+        with self._lock:
+            recording = self._recordings.get(key)
+        if recording is None:
+            # 녹화 로드는 잠금 밖에서 (다른 세션 요청을 막지 않도록)
+            recording = self.loader(source, **load_kwargs)
+
+        with self._lock:
+            if session_id is None:
+                session_id = uuid.uuid4().hex[:8]
+            if session_id in self._sessions:
+                raise ValueError(f"Session {session_id} already exists.")
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError(f"Too many replay sessions (max {self.max_sessions}).")
+
+            info, data = self._recordings.setdefault(key, recording)
+            session = ReplaySession(session_id, source, data, info, info["sfreq"], speed, start)
+            self._sessions[session_id] = session
+            self._session_keys[session_id] = key
+
+        return session
+
+    def _recording_key(self, source: str, load_kwargs: Dict[str, Any]) -> Tuple:
+        """
+        ``(source, loader arguments)`` with the loader defaults filled in,
+        so omitted and explicitly passed defaults share one recording.
+        """
+        bound = inspect.signature(self.loader).bind(source, **load_kwargs)
+        bound.apply_defaults()
+
+        arguments = {}
+        for name, value in list(bound.arguments.items())[1:]:
+            if bound.signature.parameters[name].kind == inspect.Parameter.VAR_KEYWORD:
+                arguments.update(value)
+            else:
+                arguments[name] = value
+        return source, tuple(sorted(arguments.items()))
+
+    def get(self, session_id: str) -> ReplaySession:
+        with self._lock:
+            if session_id not in self._sessions:
+                raise KeyError(f"Unknown replay session: {session_id}")
+            return self._sessions[session_id]
+
+    def close(self, session_id: str) -> None:
+        with self._lock:
+            if session_id not in self._sessions:
+                raise KeyError(f"Unknown replay session: {session_id}")
+            self._sessions.pop(session_id).closed = True
+            key = self._session_keys.pop(session_id)
+            if key not in self._session_keys.values():
+                del self._recordings[key]
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.status() for session in sessions]
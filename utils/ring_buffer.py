@@ -0,0 +1,106 @@
+from typing import Tuple
+
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, n_channels: int, capacity: int, dtype=np.float32):
+        """
+        Preallocated circular buffer of multi-channel samples.
+
+        Every sample is written twice, at ``i % capacity`` and
+        ``i % capacity + capacity``, so the most recent N samples are always
+        one contiguous slice and can be returned as a view without copying.
+
+        There is a single writer and any number of readers. The writer
+        publishes the new ``write_index`` only after the samples are in
+        place, so readers need no lock. Views stay valid until the writer
+        laps them, so readers that keep data longer than ``capacity``
+        samples should copy it.
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels.
+        capacity : int
+            The number of samples kept per channel.
+        dtype : optional
+            The sample dtype, by default np.float32.
+        """
+        self.n_channels = n_channels
+        self.capacity = capacity
+
+        self._data = np.zeros((n_channels, 2 * capacity), dtype=dtype)
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._write_index = 0
+
+    @property
+    def write_index(self) -> int:
+        """Total number of samples written so far (monotonically increasing)."""
+        return self._write_index
+
+    def write(self, samples: np.ndarray, timestamps: np.ndarray) -> None:
+        """
+        Appends a chunk of samples.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            The chunk of shape (n_channels, n_samples).
+        timestamps : np.ndarray
+            The timestamp of every sample, shape (n_samples,).
+        """
+        samples = np.asarray(samples)
+        timestamps = np.asarray(timestamps)
+        n = samples.shape[1]
+        if n == 0:
+            return
+
+        index = self._write_index
+        if n > self.capacity:
+            index += n - self.capacity
+            samples = samples[:, -self.capacity:]
+            timestamps = timestamps[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        start = index % cap
+        first = min(n, cap - start)
+        rest = n - first
+
+        for offset in (0, cap):
+            self._data[:, offset + start:offset + start + first] = samples[:, :first]
+            self._times[offset + start:offset + start + first] = timestamps[:first]
+            if rest:
+                self._data[:, offset:offset + rest] = samples[:, first:]
+                self._times[offset:offset + rest] = timestamps[first:]
+
+        self._write_index = index + n
+
+    def latest(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zero-copy views of the last ``n`` samples (fewer if not yet written).
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Samples of shape (n_channels, n) and their timestamps (n,).
+        """
+        end_index = self._write_index
+        n = max(0, min(n, end_index, self.capacity))
+        end = end_index % self.capacity + self.capacity
+        return self._data[:, end - n:end], self._times[end - n:end]
+
+    def since(self, index: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Zero-copy views of every sample written at or after absolute
+        ``index``. Samples already overwritten are skipped.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, int]
+            The samples, their timestamps and the index to pass next time.
+        """
+        end_index = self._write_index
+        data, times = self.latest(end_index - index)
+        return data, times, end_index
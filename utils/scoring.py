@@ -0,0 +1,287 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.eeg_cache import read_cache, read_mat
+from utils.features import SFREQ, extract_features_batch, feature_window
+from utils.model_registry import AttentionModelRegistry
+
+
+# model output -> attention state, same mapping as the /attention_feed_model streams
+ATTENTION_STATES = {0: "focus", 1: "unfocus", 2: "drowsy"}
+SELECT_CH = ['F7', 'F3', 'AF4', 'P7', 'P8', 'O1', 'O2']
+
+
+def sliding_windows(data: np.ndarray, time_points: int, hop: int) -> np.ndarray:
+    """
+    Zero-copy (n_windows, time_points, n_channels) view of every window of
+    a (n_channels, n_samples) recording, ``hop`` samples apart.
+    """
+    view = sliding_window_view(data, time_points, axis=1)[:, ::hop]
+    return view.transpose(1, 2, 0)
+
+
+def window_features(
+    data: np.ndarray,
+    time_window: int,
+    hop: int,
+    sfreq: float = SFREQ,
+    batch_size: int = 256,
+) -> np.ndarray:
+    """
+    Attention features of every window of a (n_channels, n_samples)
+    recording, computed ``batch_size`` windows per vectorized call to keep
+    the STFT buffers small on long recordings.
+    """
+    time_points = int(time_window * sfreq)
+    if data.shape[1] < time_points:
+        raise ValueError(
+            f"Recording has {data.shape[1]} samples, shorter than one {time_window}s window"
+        )
+
+    windows = sliding_windows(data, time_points, hop)
+    window_blackman = feature_window()
+    return np.concatenate([
+        extract_features_batch(windows[i:i + batch_size], time_window, window_blackman, sfreq)
+        for i in range(0, len(windows), batch_size)
+    ])
+
+
+def load_recording(
+    path: str, layout: Literal["deap", "emotiv"] = "deap", trial: int = 0
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Loads a .mat recording, or memory-maps a .npy cache from utils.eeg_cache."""
+    if path.endswith(".npy"):
+        return read_cache(path)
+    return read_mat(path, layout, trial)
+
+
+def score_recording(
+    data: np.ndarray,
+    ch_names: Sequence[str],
+    scaler: Any,
+    model: Any,
+    time_window: int,
+    sfreq: float = SFREQ,
+    hop: Optional[float] = None,
+    channels: Sequence[str] = SELECT_CH,
+    batch_size: int = 256,
+):
+    """
+    Attention timeline of a whole recording.
+
+    All window features are computed first, then the scaler and the model
+    run once over the full feature matrix.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        The recording, of shape (n_channels, n_samples).
+    ch_names : Sequence[str]
+        The channel names of the rows of ``data``.
+    scaler : Any
+        The fitted scaler of ``time_window``.
+    model : Any
+        The fitted classifier of ``time_window``.
+    time_window : int
+        The window length in seconds (1, 5, 10 or 15).
+    sfreq : float, optional
+        The sampling rate, must match the models, by default 128.
+    hop : Optional[float], optional
+        Seconds between window starts, by default ``time_window``
+        (non-overlapping windows).
+    channels : Sequence[str], optional
+        The model input channels, by default SELECT_CH.
+    batch_size : int, optional
+        Windows per feature extraction call, by default 256.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per window: start/end in seconds, label and state.
+    """
+    import pandas as pd
+
+    if sfreq != SFREQ:
+        raise ValueError(f"The attention models expect {SFREQ} Hz data, but got {sfreq} Hz")
+
+    hop_samples = max(1, int(round((time_window if hop is None else hop) * sfreq)))
+    picks = [list(ch_names).index(ch) for ch in channels]
+
+    features = window_features(data[picks], time_window, hop_samples, sfreq, batch_size)
+    labels = model.predict(scaler.transform(features))
+
+    start = np.arange(len(labels)) * hop_samples / sfreq
+    return pd.DataFrame({
+        "start": start,
+        "end": start + time_window,
+        "label": labels,
+        "state": [ATTENTION_STATES.get(int(label), "unknown") for label in labels],
+    })
+
+
+def write_timeline(timeline, path: str) -> None:
+    """Writes a timeline as Parquet for .parquet paths and as CSV otherwise."""
+    if path.endswith(".parquet"):
+        timeline.to_parquet(path, index=False)
+    else:
+        timeline.to_csv(path, index=False)
+
+
+# per-process state of score_archive workers, filled once by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(model_dir: str, time_window: int, backend: str) -> None:
+    from threadpoolctl import threadpool_limits
+
+    # one BLAS thread per process, the pool already uses every core
+    _worker["threadpool_limits"] = threadpool_limits(1)
+    _worker["models"] = AttentionModelRegistry(model_dir, backend=backend).get(time_window)
+
+
+def _score_file(path: str, time_window: int, options: Dict[str, Any]):
+    scaler, model = _worker["models"]
+    data, meta = load_recording(path, options["layout"], options["trial"])
+    return score_recording(data[:, options["start"]:], meta["ch_names"], scaler, model, time_window,
+                           sfreq=meta["sfreq"], hop=options["hop"], batch_size=options["batch_size"])
+
+
+def model_fingerprint(model_dir: str, time_window: int) -> List[List[float]]:
+    """(mtime, size) of the scaler and model files, changes whenever they are replaced."""
+    return [[os.path.getmtime(path), os.path.getsize(path)]
+            for path in AttentionModelRegistry(model_dir).paths(time_window)]
+
+
+def score_archive(
+    recordings: Sequence[str],
+    checkpoint_dir: str,
+    time_window: int = 1,
+    model_dir: str = "./models",
+    workers: Optional[int] = None,
+    layout: Literal["deap", "emotiv"] = "deap",
+    trial: int = 0,
+    start: int = 0,
+    hop: Optional[float] = None,
+    batch_size: int = 256,
+    backend: str = "sklearn",
+    archive_dir: Optional[str] = None,
+):
+    """
+    Scores many recordings in parallel and returns one timeline with a
+    ``recording`` column.
+
+    Every worker process loads the scaler/model once when it starts. Each
+    finished recording is checkpointed to ``checkpoint_dir``, so an
+    interrupted run picks up where it stopped. The checkpoints are
+    discarded when the model files or the scoring options change, and a
+    recording whose file changed (mtime or size) is scored again.
+    Recordings that fail are reported and left out; the next run retries
+    them.
+
+    Parameters
+    ----------
+    recordings : Sequence[str]
+        The .mat or .npy recordings to score.
+    checkpoint_dir : str
+        The directory holding one result file per finished recording.
+    time_window : int, optional
+        The window length in seconds, by default 1.
+    model_dir : str, optional
+        The directory holding the scaler/model files, by default "./models".
+    workers : Optional[int], optional
+        The number of processes, by default one per CPU.
+    layout, trial, start, hop, batch_size : optional
+        Passed on to ``load_recording`` and ``score_recording``.
+    backend : str, optional
+        The KNN inference backend of the workers, by default "sklearn".
+    archive_dir : Optional[str], optional
+        Checkpoints are named after the recording path relative to this
+        directory, by default the absolute recording path.
+
+    Returns
+    -------
+    pd.DataFrame
+        The timelines of all scored recordings, in the order of ``recordings``.
+    """
+    import pandas as pd
+    from tqdm import tqdm
+
+    options = {"layout": layout, "trial": trial, "start": start, "hop": hop, "batch_size": batch_size}
+    manifest = {
+        "time_window": time_window,
+        "backend": backend,
+        "models": model_fingerprint(model_dir, time_window),
+        "options": {k: v for k, v in options.items() if k != "batch_size"},
+    }
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    manifest_path = os.path.join(checkpoint_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) != manifest:
+                print(f"Models or options changed, discarding checkpoints in {checkpoint_dir}")
+                for part in glob.glob(os.path.join(checkpoint_dir, "*.pkl")):
+                    os.remove(part)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    def part_name(path: str) -> str:
+        path = os.path.abspath(path)
+        if archive_dir is not None:
+            name = os.path.relpath(path, os.path.abspath(archive_dir))
+        else:
+            name = os.path.splitdrive(path)[1].lstrip(os.sep)
+        return name.replace(os.sep, "__")
+
+    def part_path(path: str) -> str:
+        # 파일이 바뀌면(mtime/size) 체크포인트 이름도 바뀌어 다시 채점됨
+        stat = os.stat(path)
+        return os.path.join(checkpoint_dir, f"{part_name(path)}.{stat.st_mtime_ns}-{stat.st_size}.pkl")
+
+    # 수정된 녹화의 예전 체크포인트 삭제
+    for path in recordings:
+        current = part_path(path)
+        for part in glob.glob(os.path.join(glob.escape(checkpoint_dir), f"{glob.escape(part_name(path))}.*-*.pkl")):
+            if part != current:
+                os.remove(part)
+
+    todo = [path for path in recordings if not os.path.exists(part_path(path))]
+    print(f"{len(recordings) - len(todo)} of {len(recordings)} recordings already scored")
+
+    failed = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_dir, time_window, backend)) as pool:
+            futures = {pool.submit(_score_file, path, time_window, options): path for path in todo}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Scoring", unit="rec"):
+                path = futures[future]
+                try:
+                    timeline = future.result()
+                except Exception as e:
+                    failed.append(path)
+                    tqdm.write(f"Failed to score {path}: {e}")
+                    continue
+                # 임시 파일에 쓰고 이름 변경, 중단되어도 반쯤 쓴 체크포인트가 남지 않음
+                tmp_path = part_path(path) + ".tmp"
+                timeline.to_pickle(tmp_path)
+                os.replace(tmp_path, part_path(path))
+
+    if failed:
+        print(f"{len(failed)} recordings failed and will be retried on the next run")
+
+    timelines = []
+    for path in recordings:
+        if os.path.exists(part_path(path)):
+            timeline = pd.read_pickle(part_path(path))
+            timeline.insert(0, "recording", path)
+            timelines.append(timeline)
+
+    if not timelines:
+        return pd.DataFrame(columns=["recording", "start", "end", "label", "state"])
+    return pd.concat(timelines, ignore_index=True)
@@ -0,0 +1,244 @@
+import base64
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import cv2
+import matplotlib as mpl
+import mne
+import numpy as np
+from scipy.interpolate import CloughTocher2DInterpolator
+from scipy.spatial import Delaunay
+
+
+def channel_positions(
+    info: mne.Info, picks: Optional[Sequence[int]] = None, head_radius: float = 0.095
+) -> np.ndarray:
+    """
+    2D sensor positions in head-radius units (the head outline is the unit
+    circle), using the same azimuthal equidistant projection as
+    ``mne.viz.plot_topomap`` with the default sphere.
+    """
+    if picks is None:
+        picks = mne.pick_types(info, meg=False, eeg=True)
+
+    pos = np.array([info["chs"][pick]["loc"][:3] for pick in picks])
+    radius = np.linalg.norm(pos, axis=1)
+    polar = np.arccos(np.clip(pos[:, 2] / radius, -1.0, 1.0))
+    azimuth = np.arctan2(pos[:, 1], pos[:, 0])
+    scale = polar / (np.pi / 2) * radius / head_radius
+    return np.column_stack([scale * np.cos(azimuth), scale * np.sin(azimuth)])
+
+
+def interpolation_matrix(
+    pos: np.ndarray, points: np.ndarray, n_border: int = 64, border_radius: float = 1.2
+) -> np.ndarray:
+    """
+    Linear map from channel values to interpolated values at ``points``.
+
+    Like MNE's ``extrapolate='head'`` mode, a ring of border points is added
+    around the head, each holding the mean of its Delaunay neighbours, and
+    everything is interpolated with a Clough-Tocher scheme. Both steps are
+    linear in the channel values, so interpolating the identity gives a
+    matrix that turns every later frame into a single matrix-vector product.
+
+    Returns
+    -------
+    np.ndarray
+        Matrix of shape (n_points, n_channels).
+    """
+    n_channels = len(pos)
+    angles = np.linspace(0, 2 * np.pi, n_border, endpoint=False)
+    border = border_radius * np.column_stack([np.cos(angles), np.sin(angles)])
+    all_pos = np.concatenate([pos, border])
+
+    indptr, indices = Delaunay(all_pos).vertex_neighbor_vertices
+    border_weights = np.zeros((n_border, n_channels))
+    for i in range(n_border):
+        neighbours = indices[indptr[n_channels + i]:indptr[n_channels + i + 1]]
+        neighbours = neighbours[neighbours < n_channels]
+        if len(neighbours) == 0:
+            neighbours = [np.argmin(np.linalg.norm(pos - border[i], axis=1))]
+        border_weights[i, neighbours] = 1.0 / len(neighbours)
+
+    basis = np.concatenate([np.eye(n_channels), border_weights])
+    interp = CloughTocher2DInterpolator(all_pos, basis, fill_value=0.0)
+    return interp(points)
+
+
+def head_grid(size: int, extent: float = 1.3):
+    """
+    Square pixel grid in head-radius units, top row first. Returns the
+    x/y/radius grids, the outline line width and the flat indices of the
+    pixels inside the head.
+    """
+    axis = np.linspace(-extent, extent, size)
+    xx, yy = np.meshgrid(axis, -axis)
+    rr = np.hypot(xx, yy)
+    line = 2.0 * extent / size
+    inside_idx = np.flatnonzero(rr < 1.0 - line)
+    return xx, yy, rr, line, inside_idx
+
+
+def colormap_lut(cmap: str = "jet") -> np.ndarray:
+    """256-entry RGBA uint8 lookup table of a matplotlib colormap."""
+    colors = mpl.colormaps[cmap](np.linspace(0.0, 1.0, 256))
+    return np.round(colors * 255).astype(np.uint8)
+
+
+def topomap_meta(
+    info: mne.Info,
+    vlim: Tuple[float, float],
+    picks: Optional[Sequence[int]] = None,
+    grid: int = 64,
+    cmap: str = "jet",
+    extent: float = 1.3,
+) -> Dict[str, Any]:
+    """
+    Everything a browser needs to draw topomaps from raw channel values:
+    the head mask and the interpolation matrix of a ``grid`` x ``grid``
+    image (weights quantized to int16), the colormap LUT and the colour
+    limits. It is sent once, after which each frame is only the channel
+    values.
+    """
+    if picks is None:
+        picks = mne.pick_types(info, meg=False, eeg=True)
+
+    pos = channel_positions(info, picks)
+    xx, yy, _, _, inside_idx = head_grid(grid, extent)
+    points = np.column_stack([xx.ravel()[inside_idx], yy.ravel()[inside_idx]])
+    weights = interpolation_matrix(pos, points)
+
+    weight_scale = np.abs(weights).max() / 32767
+    quantized = np.round(weights / weight_scale).astype("<i2")
+    mask = np.zeros(grid * grid, dtype=np.uint8)
+    mask[inside_idx] = 1
+
+    return {
+        "ch_names": [info["ch_names"][pick] for pick in picks],
+        "pos": np.round(pos, 4).tolist(),
+        "vlim": [float(vlim[0]), float(vlim[1])],
+        "grid": grid,
+        "extent": extent,
+        "mask": base64.b64encode(mask.tobytes()).decode("ascii"),
+        "weights": base64.b64encode(quantized.tobytes()).decode("ascii"),
+        "weight_scale": float(weight_scale),
+        "lut": base64.b64encode(colormap_lut(cmap)[:, :3].tobytes()).decode("ascii"),
+    }
+
+
+class TopomapRenderer:
+    def __init__(
+        self,
+        info: mne.Info,
+        vlim: Tuple[float, float],
+        picks: Optional[Sequence[int]] = None,
+        size: int = 256,
+        cmap: str = "jet",
+        colorbar: bool = True,
+        outline_color: Tuple[int, int, int] = (255, 255, 255),
+    ):
+        """
+        Topomap renderer that avoids matplotlib/MNE on the per-frame path.
+
+        Everything that does not depend on the data is computed once: the
+        interpolation matrix from the montage in ``info``, the head mask
+        and outline, the colormap lookup table, the colorbar and the output
+        buffer. A frame is then one matrix-vector product, one LUT lookup
+        and one PNG encode.
+
+        Parameters
+        ----------
+        info : mne.Info
+            The measurement info holding the montage.
+        vlim : Tuple[float, float]
+            The (vmin, vmax) colour limits.
+        picks : Optional[Sequence[int]], optional
+            Channels to plot, by default all EEG channels of ``info``.
+        size : int, optional
+            Height and width of the head image in pixels, by default 256.
+        cmap : str, optional
+            The matplotlib colormap name, by default "jet".
+        colorbar : bool, optional
+            Whether to draw a colorbar to the right of the head,
+            by default True.
+        outline_color : Tuple[int, int, int], optional
+            The RGB colour of the head outline, by default white.
+        """
+        self.vmin, self.vmax = vlim
+        self.size = size
+        self.pos = channel_positions(info, picks)
+        self.n_channels = len(self.pos)
+
+        # pixel grid in head-radius units; margin leaves room for nose and ears
+        xx, yy, rr, line, self._inside_idx = head_grid(size)
+        points = np.column_stack([xx.ravel()[self._inside_idx], yy.ravel()[self._inside_idx]])
+        self._weights = np.ascontiguousarray(
+            interpolation_matrix(self.pos, points), dtype=np.float32
+        )
+
+        # BGRA lookup table, 256 entries
+        self._lut = np.ascontiguousarray(colormap_lut(cmap)[:, [2, 1, 0, 3]])
+        self._scale = 255.0 / (self.vmax - self.vmin)
+
+        bar_width = size // 6 if colorbar else 0
+        self.buffer = np.zeros((size, size + bar_width, 4), dtype=np.uint8)
+        self._pixels = self.buffer.reshape(-1, 4)
+        rows, cols = np.divmod(self._inside_idx, size)
+        self._pixel_idx = rows * self.buffer.shape[1] + cols
+        self._values = np.empty(len(self._inside_idx), dtype=np.float32)
+        self._lut_index = np.empty(len(self._inside_idx), dtype=np.intp)
+
+        self._draw_outline(xx, yy, rr, line, outline_color)
+        if colorbar:
+            self._draw_colorbar(bar_width, outline_color)
+
+        self._encode_params = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+    def _draw_outline(self, xx, yy, rr, line, color) -> None:
+        bgra = np.array([color[2], color[1], color[0], 255], dtype=np.uint8)
+        head = np.abs(rr - 1.0) < line
+        # nose: a small triangle above the head
+        nose = (yy > 0.98) & (yy < 1.15) & (np.abs(np.abs(xx) - (1.15 - yy) * 0.6) < line)
+        # ears: small arcs on both sides
+        ear_r = np.hypot((np.abs(xx) - 1.0) / 0.08, yy / 0.18)
+        ears = (np.abs(xx) > 1.0) & (np.abs(ear_r - 1.0) < line / 0.08)
+        self.buffer[:, :self.size][head | nose | ears] = bgra
+
+    def _draw_colorbar(self, bar_width: int, color) -> None:
+        margin = self.size // 10
+        top, bottom = margin, self.size - margin
+        left = bar_width // 4
+        right = left + bar_width // 4
+        ramp = np.linspace(255, 0, bottom - top).astype(np.intp)
+        self.buffer[top:bottom, self.size + left:self.size + right] = self._lut[ramp][:, None]
+
+        bgra = (color[2], color[1], color[0], 255)
+        for value, y in ((self.vmax, top + 4), (self.vmin, bottom)):
+            cv2.putText(self.buffer, f"{value:g}", (self.size + right + 2, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.3, bgra, 1, cv2.LINE_AA)
+
+    def render(self, values: np.ndarray) -> np.ndarray:
+        """
+        Renders one frame into the shared buffer.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            One value per channel.
+
+        Returns
+        -------
+        np.ndarray
+            The BGRA image of shape (size, size + colorbar, 4). This is the
+            renderer's own buffer and is overwritten by the next call.
+        """
+        np.dot(self._weights, np.asarray(values, dtype=np.float32), out=self._values)
+        self._values -= self.vmin
+        self._values *= self._scale
+        np.clip(self._values, 0, 255, out=self._values)
+        self._lut_index[:] = self._values
+        self._pixels[self._pixel_idx] = self._lut[self._lut_index]
+        return self.buffer
+
+    def render_png(self, values: np.ndarray) -> bytes:
+        _, png = cv2.imencode(".png", self.render(values), self._encode_params)
+        return png.tobytes()
@@ -1,8 +1,9 @@
 import gc
 import os
+from collections import OrderedDict
 from pathlib import Path
 import traceback
-from typing import List, Literal, Optional, Union, Dict
+from typing import Iterable, List, Literal, Optional, Union, Dict
 
 import numpy as np
 import torch
@@ -25,7 +26,7 @@ class StreamDiffusionWrapper:
         t_index_list: List[int],
         lora_dict: Optional[Dict[str, float]] = None,
         mode: Literal["img2img", "txt2img"] = "img2img",
-        output_type: Literal["pil", "pt", "np", "latent"] = "pil",
+        output_type: Literal["pil", "pt", "np", "latent", "bgr"] = "pil",
         lcm_lora_id: Optional[str] = None,
         vae_id: Optional[str] = None,
         device: Literal["cpu", "cuda"] = "cuda",
@@ -47,6 +48,7 @@ class StreamDiffusionWrapper:
         seed: int = 2,
         use_safety_checker: bool = False,
         engine_dir: Optional[Union[str, Path]] = "engines",
+        prompt_cache_size: int = 32,
     ):
         """
         Initializes the StreamDiffusionWrapper.
@@ -63,8 +65,10 @@ class StreamDiffusionWrapper:
             Example: {'LoRA_1' : 0.5 , 'LoRA_2' : 0.7 ,...}
         mode : Literal["img2img", "txt2img"], optional
             txt2img or img2img, by default "img2img".
-        output_type : Literal["pil", "pt", "np", "latent"], optional
+        output_type : Literal["pil", "pt", "np", "latent", "bgr"], optional
             The output type of image, by default "pil".
+            "bgr" returns uint8 (H, W, 3) BGR numpy frames, ready for
+            OpenCV, converted on the device.
         lcm_lora_id : Optional[str], optional
             The lcm_lora_id to load, by default None.
             If None, the default LCM-LoRA
@@ -113,6 +117,9 @@ class StreamDiffusionWrapper:
             The seed, by default 2.
         use_safety_checker : bool, optional
             Whether to use safety checker or not, by default False.
+        prompt_cache_size : int, optional
+            The number of encoded prompts kept by ``update_prompt``
+            (least recently used first out), by default 32.
         """
         self.sd_turbo = "turbo" in model_id_or_path
 
@@ -127,6 +134,11 @@ class StreamDiffusionWrapper:
                         "txt2img mode cannot use denoising batch with frame_buffer_size > 1."
                     )
 
+        if output_type == "bgr" and use_safety_checker:
+            raise ValueError(
+                "The safety checker works on PIL images and cannot be used with output_type = 'bgr'"
+            )
+
         if mode == "img2img":
             if not use_denoising_batch:
                 raise NotImplementedError(
@@ -149,6 +161,18 @@ class StreamDiffusionWrapper:
         self.use_denoising_batch = use_denoising_batch
         self.use_safety_checker = use_safety_checker
 
+        # encoded prompt embeddings, so switching to a known prompt skips the text encoder
+        self.prompt_cache_size = prompt_cache_size
+        self._prompt_cache: "OrderedDict[str, torch.Tensor]" = OrderedDict()
+        self._prompt: Optional[str] = None
+        self.prompt_cache_hits = 0
+        self.prompt_cache_misses = 0
+
+        # reusable buffers of preprocess_image for BGR numpy frames
+        self._frame_host: Optional[torch.Tensor] = None
+        self._frame_input: Optional[torch.Tensor] = None
+        self._frame_uploaded: Optional[torch.cuda.Event] = None
+
         self.stream: StreamDiffusion = self._load_model(
             model_id_or_path=model_id_or_path,
             lora_dict=lora_dict,
@@ -180,6 +204,7 @@ class StreamDiffusionWrapper:
         num_inference_steps: int = 50,
         guidance_scale: float = 1.2,
         delta: float = 1.0,
+        prompts: Optional[Iterable[str]] = None,
     ) -> None:
         """
         Prepares the model for inference.
@@ -195,6 +220,9 @@ class StreamDiffusionWrapper:
         delta : float, optional
             The delta multiplier of virtual residual noise,
             by default 1.0.
+        prompts : Optional[Iterable[str]], optional
+            Prompts used later with ``update_prompt``, encoded now so that
+            switching to them is a tensor swap, by default None.
         """
         self.stream.prepare(
             prompt,
@@ -204,9 +232,53 @@ class StreamDiffusionWrapper:
             delta=delta,
         )
 
+        self._prompt_cache.clear()
+        self._prompt = prompt
+        for cached_prompt in prompts or []:
+            self._prompt_embeds(cached_prompt)
+
+    def update_prompt(self, prompt: str) -> None:
+        """
+        Switches the prompt. Encoded prompts are kept in an LRU cache, so
+        the text encoder only runs for a prompt that is not cached.
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to generate images from.
+        """
+        if prompt == self._prompt:
+            return
+
+        self.stream.prompt_embeds = self._prompt_embeds(prompt)
+        self._prompt = prompt
+
+    @torch.no_grad()
+    def _prompt_embeds(self, prompt: str) -> torch.Tensor:
+        prompt_embeds = self._prompt_cache.get(prompt)
+        if prompt_embeds is not None:
+            self._prompt_cache.move_to_end(prompt)
+            self.prompt_cache_hits += 1
+            return prompt_embeds
+
+        # same encoding as StreamDiffusion.update_prompt
+        self.prompt_cache_misses += 1
+        encoder_output = self.stream.pipe.encode_prompt(
+            prompt=prompt,
+            device=self.device,
+            num_images_per_prompt=1,
+            do_classifier_free_guidance=False,
+        )
+        prompt_embeds = encoder_output[0].repeat(self.stream.batch_size, 1, 1)
+
+        self._prompt_cache[prompt] = prompt_embeds
+        if len(self._prompt_cache) > self.prompt_cache_size:
+            self._prompt_cache.popitem(last=False)
+        return prompt_embeds
+
     def __call__(
         self,
-        image: Optional[Union[str, Image.Image, torch.Tensor]] = None,
+        image: Optional[Union[str, Image.Image, np.ndarray, torch.Tensor]] = None,
         prompt: Optional[str] = None,
     ) -> Union[Image.Image, List[Image.Image]]:
         """
@@ -214,8 +286,9 @@ class StreamDiffusionWrapper:
 
         Parameters
         ----------
-        image : Optional[Union[str, Image.Image, torch.Tensor]]
-            The image to generate from.
+        image : Optional[Union[str, Image.Image, np.ndarray, torch.Tensor]]
+            The image to generate from. A numpy array is an (H, W, 3)
+            uint8 BGR frame, as returned by OpenCV.
         prompt : Optional[str]
             The prompt to generate images from.
 
@@ -246,7 +319,7 @@ class StreamDiffusionWrapper:
             The generated image.
         """
         if prompt is not None:
-            self.stream.update_prompt(prompt)
+            self.update_prompt(prompt)
 
         if self.sd_turbo:
             image_tensor = self.stream.txt2img_sd_turbo(self.batch_size)
@@ -267,15 +340,16 @@ class StreamDiffusionWrapper:
         return image
 
     def img2img(
-        self, image: Union[str, Image.Image, torch.Tensor], prompt: Optional[str] = None
+        self, image: Union[str, Image.Image, np.ndarray, torch.Tensor], prompt: Optional[str] = None
     ) -> Union[Image.Image, List[Image.Image], torch.Tensor, np.ndarray]:
         """
         Performs img2img.
 
         Parameters
         ----------
-        image : Union[str, Image.Image, torch.Tensor]
-            The image to generate from.
+        image : Union[str, Image.Image, np.ndarray, torch.Tensor]
+            The image to generate from. A numpy array is an (H, W, 3)
+            uint8 BGR frame, as returned by OpenCV.
 
         Returns
         -------
@@ -283,9 +357,9 @@ class StreamDiffusionWrapper:
             The generated image.
         """
         if prompt is not None:
-            self.stream.update_prompt(prompt)
+            self.update_prompt(prompt)
 
-        if isinstance(image, str) or isinstance(image, Image.Image):
+        if isinstance(image, (str, Image.Image, np.ndarray)):
             image = self.preprocess_image(image)
 
         image_tensor = self.stream(image)
@@ -303,20 +377,23 @@ class StreamDiffusionWrapper:
 
         return image
 
-    def preprocess_image(self, image: Union[str, Image.Image]) -> torch.Tensor:
+    def preprocess_image(self, image: Union[str, Image.Image, np.ndarray]) -> torch.Tensor:
         """
         Preprocesses the image.
 
         Parameters
         ----------
-        image : Union[str, Image.Image, torch.Tensor]
-            The image to preprocess.
+        image : Union[str, Image.Image, np.ndarray]
+            The image to preprocess. A numpy array is an (H, W, 3) uint8
+            BGR frame, as returned by OpenCV.
 
         Returns
         -------
         torch.Tensor
             The preprocessed image.
         """
+        if isinstance(image, np.ndarray):
+            return self.preprocess_frame(image)
         if isinstance(image, str):
             image = Image.open(image).convert("RGB").resize((self.width, self.height))
         if isinstance(image, Image.Image):
@@ -326,6 +403,63 @@ class StreamDiffusionWrapper:
             image, self.height, self.width
         ).to(device=self.device, dtype=self.dtype)
 
+    def preprocess_frame(self, frame: np.ndarray) -> torch.Tensor:
+        """
+        Preprocesses a BGR frame without PIL or file I/O.
+
+        The frame is copied into a reusable pinned host buffer and uploaded
+        asynchronously; the BGR to RGB flip, the resize and the scaling to
+        [-1, 1] then run as tensor ops on the device, into a preallocated
+        input tensor.
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            The (H, W, 3) uint8 BGR frame.
+
+        Returns
+        -------
+        torch.Tensor
+            The preprocessed image, of shape (1, 3, height, width). The
+            tensor is reused, so it is only valid until the next call.
+        """
+        if frame.ndim != 3 or frame.shape[2] != 3 or frame.dtype != np.uint8:
+            raise ValueError(
+                f"Expected an (H, W, 3) uint8 BGR frame, but got {frame.shape} {frame.dtype}"
+            )
+
+        pinned = self.device == "cuda"
+        if self._frame_host is None or tuple(self._frame_host.shape) != frame.shape:
+            self._frame_host = torch.empty(frame.shape, dtype=torch.uint8, pin_memory=pinned)
+            self._frame_uploaded = None
+        if self._frame_input is None:
+            self._frame_input = torch.empty(
+                (1, 3, self.height, self.width), device=self.device, dtype=self.dtype
+            )
+
+        # the previous asynchronous upload must be done before the host buffer is overwritten
+        if self._frame_uploaded is not None:
+            self._frame_uploaded.synchronize()
+        self._frame_host.numpy()[...] = frame
+        pixels = self._frame_host.to(self.device, non_blocking=pinned)
+        if pinned:
+            self._frame_uploaded = torch.cuda.Event()
+            self._frame_uploaded.record()
+
+        # (H, W, BGR) uint8 -> (1, RGB, H, W) float
+        pixels = pixels.flip(-1).permute(2, 0, 1).unsqueeze(0).float()
+        if pixels.shape[-2:] != (self.height, self.width):
+            pixels = torch.nn.functional.interpolate(
+                pixels,
+                size=(self.height, self.width),
+                mode="bicubic",
+                align_corners=False,
+                antialias=True,
+            )
+        self._frame_input.copy_(pixels.div_(127.5).sub_(1.0).clamp_(-1.0, 1.0))
+
+        return self._frame_input
+
     def postprocess_image(
         self, image_tensor: torch.Tensor, output_type: str = "pil"
     ) -> Union[Image.Image, List[Image.Image], torch.Tensor, np.ndarray]:
@@ -342,11 +476,37 @@ class StreamDiffusionWrapper:
         Union[Image.Image, List[Image.Image]]
             The postprocessed image.
         """
+        if output_type == "bgr":
+            frames = self.postprocess_frame(image_tensor)
+            return frames if self.frame_buffer_size > 1 else frames[0]
+
         if self.frame_buffer_size > 1:
             return postprocess_image(image_tensor.cpu(), output_type=output_type)
         else:
             return postprocess_image(image_tensor.cpu(), output_type=output_type)[0]
 
+    def postprocess_frame(self, image_tensor: torch.Tensor) -> np.ndarray:
+        """
+        Converts the decoded images to uint8 BGR frames on the device, so
+        a single compact uint8 copy goes back to the host. Works the same
+        on the CPU.
+
+        Parameters
+        ----------
+        image_tensor : torch.Tensor
+            The decoded images in [-1, 1], of shape (N, 3, H, W).
+
+        Returns
+        -------
+        np.ndarray
+            The frames, of shape (N, H, W, 3), rounded like the PIL output.
+        """
+        # (N, RGB, H, W) [-1, 1] -> (N, H, W, BGR) uint8
+        frames = (image_tensor.float() / 2 + 0.5).clamp_(0, 1).mul_(255).round_()
+        frames = frames.to(torch.uint8).flip(1).permute(0, 2, 3, 1).contiguous()
+
+        return frames.cpu().numpy()
+
     def _load_model(
         self,
         model_id_or_path: str,